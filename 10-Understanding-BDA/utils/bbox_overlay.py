@@ -0,0 +1,222 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import ipywidgets as widgets
+import numpy as np
+from PIL import Image
+
+from .image_encoding import DEFAULT_QUALITY, encode_image
+from .spatial_index import bbox_tuple, iter_field_geometry
+
+
+# Confidence bands, drawn in this order so low-confidence boxes end up on top
+CONFIDENCE_BANDS = [
+    ('element', None, (52, 120, 246)),    # standard output elements, no confidence
+    ('high', 0.8, (40, 167, 69)),
+    ('medium', 0.5, (255, 159, 28)),
+    ('low', 0.0, (220, 53, 69)),
+]
+LINE_WIDTH = 3
+FILL_ALPHA = 0.12
+LINE_ALPHA = 0.9
+MAX_CACHED_OVERLAYS = 64
+
+_overlay_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def page_boxes(custom_output=None, standard_output=None, page_index=0):
+    """
+    Collect the normalized boxes for one page.
+
+    Args:
+        custom_output (dict): BDA custom output; boxes come from `explainability_info` geometry
+        standard_output (dict): BDA standard output; boxes come from element locations
+        page_index (int): 0-based page index
+
+    Returns:
+        tuple: (boxes as an (N, 4) array of left/top/width/height, confidences as an (N,)
+        array with NaN for standard output elements)
+    """
+    boxes, confidences = [], []
+    if custom_output:
+        explainability_info = custom_output.get('explainability_info', [])
+        if isinstance(explainability_info, dict):
+            explainability_info = [explainability_info]
+        for info in explainability_info:
+            for _, conf_info in iter_field_geometry(info):
+                for geometry in conf_info.get('geometry', []):
+                    if geometry.get('page', 0) == page_index and geometry.get('boundingBox'):
+                        boxes.append(bbox_tuple(geometry['boundingBox']))
+                        confidences.append(conf_info.get('confidence', np.nan))
+    if standard_output:
+        for element in standard_output.get('elements', []):
+            for location in element.get('locations', []):
+                if location.get('page_index', 0) == page_index and location.get('bounding_box'):
+                    boxes.append(bbox_tuple(location['bounding_box']))
+                    confidences.append(np.nan)
+    return np.array(boxes, dtype=np.float64).reshape(-1, 4), np.array(confidences, dtype=np.float64)
+
+
+def to_pixel_rects(boxes, width, height):
+    """Normalized (left, top, width, height) rows to clipped pixel (x0, y0, x1, y1) rows."""
+    scale = np.array([width, height, width, height], dtype=np.float64)
+    rects = np.rint(np.column_stack([boxes[:, :2], boxes[:, :2] + boxes[:, 2:]]) * scale).astype(np.int64)
+    rects[:, [0, 2]] = np.clip(rects[:, [0, 2]], 0, width)
+    rects[:, [1, 3]] = np.clip(rects[:, [1, 3]], 0, height)
+    return rects
+
+
+def _outline_and_fill(rects, line_width, width, height):
+    """
+    Outline and fill masks for a set of pixel rectangles, without a per-box loop.
+
+    Each rectangle and its copy shrunk by `line_width` add four corner entries to a
+    2D difference array; two cumulative sums turn that into per-pixel coverage
+    counts. The counts are packed into one int32 (outer in the low 16 bits, inner
+    above it) since the sums are linear, so both come out of a single pass. Only the
+    region spanned by the rectangles is processed.
+    """
+    x_start, y_start = rects[:, 0].min(), rects[:, 1].min()
+    x_end, y_end = rects[:, 2].max(), rects[:, 3].max()
+    local = rects - np.array([x_start, y_start, x_start, y_start])
+    inner = local + np.array([line_width, line_width, -line_width, -line_width])
+    inner = inner[(inner[:, 2] > inner[:, 0]) & (inner[:, 3] > inner[:, 1])]
+
+    diff = np.zeros((y_end - y_start + 1, x_end - x_start + 1), dtype=np.int32)
+    for boxes, weight in ((local, 1), (inner, 1 << 16)):
+        x0, y0, x1, y1 = boxes.T
+        np.add.at(diff, (y0, x0), weight)
+        np.add.at(diff, (y0, x1), -weight)
+        np.add.at(diff, (y1, x0), -weight)
+        np.add.at(diff, (y1, x1), weight)
+    packed = diff.cumsum(axis=0).cumsum(axis=1)[:-1, :-1]
+    outer_count = packed & 0xFFFF
+    inner_count = packed >> 16
+
+    region = (slice(y_start, y_end), slice(x_start, x_end))
+    return region, outer_count > inner_count, outer_count > 0
+
+
+def confidence_bands(confidences):
+    """Band index into CONFIDENCE_BANDS for every confidence value."""
+    thresholds = [band[1] for band in CONFIDENCE_BANDS[1:]]
+    bands = np.full(len(confidences), 0, dtype=np.int64)
+    known = ~np.isnan(confidences)
+    # thresholds are descending, so count how many a value falls below
+    bands[known] = 1 + (confidences[known, None] < np.array(thresholds[:-1])).sum(axis=1)
+    return bands
+
+
+def render_overlay(image, boxes, confidences, line_width=LINE_WIDTH, fill_alpha=FILL_ALPHA, line_alpha=LINE_ALPHA):
+    """
+    Draw all boxes on a page image in one compositing step.
+
+    Args:
+        image (PIL.Image): Page image
+        boxes (np.ndarray): (N, 4) normalized left/top/width/height
+        confidences (np.ndarray): (N,) confidences, NaN for boxes without one
+        line_width (int): Outline width in pixels
+        fill_alpha (float): Opacity of the box fill
+        line_alpha (float): Opacity of the outline
+
+    Returns:
+        PIL.Image: RGB image with the overlay
+    """
+    result = np.array(image.convert('RGB'))
+    height, width = result.shape[:2]
+    rects = to_pixel_rects(boxes, width, height)
+    visible = (rects[:, 2] > rects[:, 0]) & (rects[:, 3] > rects[:, 1])
+    rects, bands = rects[visible], confidence_bands(confidences)[visible]
+
+    # Per-pixel style code: 0 = untouched, 1 + 2 * band for fill, 2 + 2 * band for outline
+    codes = np.zeros((height, width), dtype=np.uint8)
+    for band in range(len(CONFIDENCE_BANDS)):
+        band_rects = rects[bands == band]
+        if not len(band_rects):
+            continue
+        region, outline, fill = _outline_and_fill(band_rects, line_width, width, height)
+        codes[region][fill] = 1 + 2 * band
+        codes[region][outline] = 2 + 2 * band
+
+    colors = np.array([(0, 0, 0)] + [rgb for _, _, rgb in CONFIDENCE_BANDS for _ in range(2)], dtype=np.float32)
+    alphas = np.array([0.0] + [fill_alpha, line_alpha] * len(CONFIDENCE_BANDS), dtype=np.float32)
+    touched = codes > 0
+    code = codes[touched]
+    alpha = alphas[code][:, None]
+    result[touched] = (result[touched] * (1 - alpha) + colors[code] * alpha).astype(np.uint8)
+    return Image.fromarray(result, 'RGB')
+
+
+def blueprint_version(custom_output):
+    """Identifier of the blueprint that produced `custom_output`, used in the cache key."""
+    matched = (custom_output or {}).get('matched_blueprint', {})
+    return matched.get('arn') or matched.get('name')
+
+
+def overlay_page(image_bytes, custom_output=None, standard_output=None, page_index=0,
+                 version=None, max_width=None, format='JPEG', quality=DEFAULT_QUALITY):
+    """
+    Encoded page image with all field and element boxes drawn on it.
+
+    Results are cached per (page, blueprint version), so paging back and forth
+    through a document does not redraw. The image is resized to `max_width` before
+    drawing, which keeps the pixel work proportional to the displayed size.
+
+    Args:
+        image_bytes (bytes): Encoded page image, e.g. from `load_image`
+        custom_output (dict): BDA custom output for the document or segment
+        standard_output (dict): BDA standard output
+        page_index (int): 0-based page index the image shows
+        version (str): Blueprint version; defaults to the matched blueprint ARN
+        max_width (int): Downscale the page before drawing
+        format (str): Output image format
+        quality (int): Output image quality
+
+    Returns:
+        bytes: Encoded image
+    """
+    version = version or blueprint_version(custom_output)
+    key = (hashlib.sha1(image_bytes).hexdigest(), page_index, version, standard_output is not None,
+           max_width, format, quality)
+    with _cache_lock:
+        if key in _overlay_cache:
+            _overlay_cache.move_to_end(key)
+            return _overlay_cache[key]
+
+    image = Image.open(io.BytesIO(image_bytes))
+    if max_width and image.width > max_width:
+        size = (max_width, round(image.height * max_width / image.width))
+        image.draft('RGB', size)
+        image = image.resize(size, Image.LANCZOS, reducing_gap=2.0)
+    boxes, confidences = page_boxes(custom_output, standard_output, page_index)
+    value = encode_image(render_overlay(image, boxes, confidences), format=format, quality=quality)[0]
+
+    with _cache_lock:
+        _overlay_cache[key] = value
+        while len(_overlay_cache) > MAX_CACHED_OVERLAYS:
+            _overlay_cache.popitem(last=False)
+    return value
+
+
+def clear_overlay_cache():
+    with _cache_lock:
+        _overlay_cache.clear()
+
+
+def overlay_legend_html():
+    items = ''.join(
+        f'<span style="display:inline-block;margin-right:12px"><span style="display:inline-block;width:12px;height:12px;'
+        f'border:2px solid rgb{rgb};margin-right:4px"></span>{name}{f" (&ge; {threshold})" if threshold else ""}</span>'
+        for name, threshold, rgb in CONFIDENCE_BANDS)
+    return f'<div style="font-size:12px;margin:4px 0">{items}</div>'
+
+
+def overlay_widget(image_bytes, custom_output=None, standard_output=None, page_index=0, width='600px', max_width=1200, **kwargs):
+    """Page image with overlays and a confidence legend, for notebook display."""
+    value = overlay_page(image_bytes, custom_output, standard_output, page_index, max_width=max_width, **kwargs)
+    image_widget = widgets.Image(value=value, format=kwargs.get('format', 'JPEG').lower())
+    image_widget.layout.width = width
+    return widgets.VBox([widgets.HTML(overlay_legend_html()), image_widget])
@@ -1,11 +1,17 @@
+import html
+import threading
 import ipywidgets as widgets
 from IPython.display import display, HTML
-import pandas as pd
 from PIL import Image
 import io
 import boto3
 from urllib.parse import urlparse
-from pdf2image import convert_from_bytes
+from .page_renderer import render_pdf_page_bytes, DEFAULT_DPI
+from .spatial_index import bbox_attribute
+from .render_cache import get_render_cache
+from .image_tiles import TiledImageViewer, get_pyramid
+from .bbox_overlay import overlay_page
+from .table_view import ColumnarTable, PagedTableView, DEFAULT_PAGE_SIZE
 
 
 s3 = boto3.client('s3')
@@ -40,7 +46,7 @@ onclick_function = """
 </script>
 """
 
-def load_image(uri):
+def load_image(uri, page_index=0, width=None, dpi=DEFAULT_DPI):
     if uri.startswith('s3://'):
         bucket, key = urlparse(uri).netloc, urlparse(uri).path.lstrip('/')
         file_content = s3.get_object(Bucket=bucket, Key=key)['Body'].read()
@@ -48,9 +54,8 @@ def load_image(uri):
         file_content = open(uri, 'rb').read()
     
     if uri.lower().endswith('.pdf'):
-        img_io = io.BytesIO()
-        convert_from_bytes(file_content)[0].save(img_io, format='JPEG')
-        return img_io.getvalue()
+        # Render only the requested page instead of the whole document
+        return render_pdf_page_bytes(file_content, page_index=page_index, width=width, dpi=dpi)
     
     img = Image.open(io.BytesIO(file_content))
     if img.format != 'JPEG':
@@ -61,6 +66,9 @@ def load_image(uri):
     
 
 def get_kv_html(kv_pairs):
+    return get_render_cache().get_or_render('kv_html', kv_pairs, lambda: _render_kv_html(kv_pairs))
+
+def _render_kv_html(kv_pairs):
     # Create key-value pairs display
     kv_html = onclick_function
     kv_html += """
@@ -74,8 +82,9 @@ def get_kv_html(kv_pairs):
             </style>
     """
     
-    for i, (key, (value, confidence)) in enumerate(kv_pairs.items()):
-        kv_html += '<tr onclick=handleClick(event) data-bbox=\'(10,40,110,200)\'><td width=100%>'
+    for i, (key, (value, confidence, *geometry)) in enumerate(kv_pairs.items()):
+        bbox = bbox_attribute(geometry[0]) if geometry else None
+        kv_html += f'<tr onclick=handleClick(event) data-bbox=\'{bbox or "(10,40,110,200)"}\'><td width=100%>'
         kv_html += create_key_value_box(key, value, confidence)
         kv_html += '</td></tr>'
     kv_html += """
@@ -116,7 +125,7 @@ def create_key_value_box(key, value, confidence):
     """
     return html
     
-def display_result(document_image_uri, kvpairs):
+def display_result(document_image_uri, kvpairs, tiled=False):
     # Create the layout with top alignment
     main_hbox_layout = widgets.Layout(
         width='100%',
@@ -126,13 +135,17 @@ def display_result(document_image_uri, kvpairs):
         margin='0'
     )
 
-    image_widget = widgets.Image(
-        value=b'',
-        format='png',
-        width='auto',
-        height='auto'
-    )
-    image_widget.value = load_image(image_path=document_image_uri)
+    image_bytes = load_image(uri=document_image_uri)
+    if tiled:
+        # Never put the full-resolution bytes on a widget: they would be synced to the browser
+        image_widget = TiledImageViewer(get_pyramid(image_bytes))
+    else:
+        image_widget = widgets.Image(
+            value=image_bytes,
+            format='png',
+            width='auto',
+            height='auto'
+        )
     image_container = widgets.Box(
         children=[image_widget],
         layout=widgets.Layout(
@@ -199,17 +212,69 @@ def display_result(document_image_uri, kvpairs):
     # Display the main layout
     display(main_layout)
 
-def display_multiple(views, view_titles = None):
-    main_tab = widgets.Tab()
-    for i, view in enumerate(views):
-        main_tab.children = (*main_tab.children, view)
-        tab_title = view_titles[i] if view_titles and view_titles[i] else f'Document {i}'
-        main_tab.set_title(i, title=tab_title)
-    display(main_tab)
+def _as_widget(content):
+    if isinstance(content, widgets.Widget):
+        return content
+    out = widgets.Output()
+    out.append_display_data(content)
+    return out
 
-def create_form_view(forms_data):
+def lazy_tabs(factories, titles=None, prefetch=False, layout=None):
+    """
+    Tab container that builds each tab's content the first time it is selected.
+
+    Args:
+        factories (list): Callables returning the tab content (a widget or displayable)
+        titles (list): Tab titles
+        prefetch (bool): Build the next tab in a background thread after a tab is shown
+        layout (widgets.Layout): Layout for the Tab widget
 
-    styles = """
+    Returns:
+        widgets.Tab
+    """
+    placeholders = [widgets.Box() for _ in factories]
+    tab = widgets.Tab(children=placeholders, **({'layout': layout} if layout else {}))
+    for i, title in enumerate(titles or []):
+        tab.set_title(i, title)
+    built = [False] * len(factories)
+    building = set()
+    lock = threading.Lock()
+
+    def materialize(index):
+        with lock:
+            if built[index] or index in building:
+                return
+            building.add(index)
+        try:
+            placeholders[index].children = (_as_widget(factories[index]()),)
+            built[index] = True
+        except Exception as e:
+            # Show the error in the tab; selecting it again retries
+            placeholders[index].children = (widgets.HTML(f'<pre>Could not build this tab: {html.escape(repr(e))}</pre>'),)
+        finally:
+            with lock:
+                building.discard(index)
+
+    def on_select(change):
+        index = change['new']
+        if index is None:
+            return
+        materialize(index)
+        if prefetch and index + 1 < len(factories):
+            threading.Thread(target=materialize, args=(index + 1,), daemon=True).start()
+
+    tab.observe(on_select, names='selected_index')
+    if factories:
+        on_select({'new': tab.selected_index or 0})
+    return tab
+
+def display_multiple(views, view_titles = None, prefetch=False):
+    # Views may be widgets or callables that build the view; callables run only when their tab is opened
+    factories = [view if callable(view) else (lambda view=view: view) for view in views]
+    titles = [view_titles[i] if view_titles and view_titles[i] else f'Document {i}' for i in range(len(views))]
+    display(lazy_tabs(factories, titles, prefetch=prefetch))
+
+FORM_VIEW_STYLES = """
     <style>
         .kv-container{display:flex;flex-direction:column;gap:4px;margin:4px;width:100%}
         .kv-box{border:0px solid #e0e0e0;border-radius:4px;padding:4px;margin:0;background-color:#f8f9fa;width:auto}
@@ -223,34 +288,7 @@ def create_form_view(forms_data):
     </style>
     """
 
-    def render_nested_keys(data):
-        if not isinstance(data, dict): 
-            return f'<div class="value">{data}</div>'
-        html = ""
-        for key, value in data.items():
-            if isinstance(value, dict) and 'value' in value:
-                conf = value.get('confidence', 0) * 100
-                html += f"""
-                    <div class='kv-box'>
-                        <div class='kv-item'><div class='key'>{key}</div></div>
-                        <div class='kc-item' onclick=handleClick(event) data-bbox='(10,40,110,200)'>
-                            <div class="value">{value['value']}</div>
-                            <div class='confidence'>{conf:.1f}%</div>
-                        </div>
-                    </div>"""
-            else:
-                html += f"""
-                    <div class='kv-box'>
-                        <div class='kv-item'><div class='key'>{key}</div></div>
-                        <div class="nested-container">{render_nested_keys(value)}</div>
-                    </div>"""
-        return html
-
-    return HTML(f"{styles}<script>function handleClick(e){{console.log(e.currentTarget.dataset.bbox)}}</script><div class='kv-container'>{render_nested_keys(forms_data)}</div>")
-
-
-def create_table_view(tables_data):
-    styles = """
+TABLE_VIEW_STYLES = """
     <style>
         .table-wrapper {
             width: 100%;
@@ -283,31 +321,65 @@ def create_table_view(tables_data):
         .confidence{color:#2196F3;font-size:0.9em}
     </style>
     """
-    
-    def process_table(table_data):
-        def format_cell(cell):
-            if isinstance(cell, dict) and 'value' in cell:
-                conf = f"<span class='confidence'>({cell.get('confidence', 0):.1%})</span>" if 'confidence' in cell else ""
-                return f"{cell['value']}{conf}"
-            return str(cell)
-        
-        return pd.DataFrame([{k: format_cell(v) for k, v in row.items()} for row in table_data])
-    
-    tables_html = "".join(
+
+def render_form_html(forms_data):
+    """Key-value HTML for the `forms` of a transformed custom output, without styles."""
+    def render_nested_keys(data):
+        if not isinstance(data, dict): 
+            return f'<div class="value">{data}</div>'
+        html = ""
+        for key, value in data.items():
+            if isinstance(value, dict) and 'value' in value:
+                conf = value.get('confidence', 0) * 100
+                bbox = bbox_attribute(value.get('geometry')) or '(10,40,110,200)'
+                html += f"""
+                    <div class='kv-box'>
+                        <div class='kv-item'><div class='key'>{key}</div></div>
+                        <div class='kc-item' onclick=handleClick(event) data-bbox='{bbox}'>
+                            <div class="value">{value['value']}</div>
+                            <div class='confidence'>{conf:.1f}%</div>
+                        </div>
+                    </div>"""
+            else:
+                html += f"""
+                    <div class='kv-box'>
+                        <div class='kv-item'><div class='key'>{key}</div></div>
+                        <div class="nested-container">{render_nested_keys(value)}</div>
+                    </div>"""
+        return html
+
+    return f"<div class='kv-container'>{render_nested_keys(forms_data)}</div>"
+
+def create_form_view(forms_data):
+    return HTML(get_render_cache().get_or_render(
+        'form_view', forms_data,
+        lambda: f"{FORM_VIEW_STYLES}<script>function handleClick(e){{console.log(e.currentTarget.dataset.bbox)}}</script>{render_form_html(forms_data)}"))
+
+
+def render_tables_html(tables_data):
+    """HTML tables for the `tables` of a transformed custom output, without styles."""
+    return "".join(
         f"""
         <div class="table-container">
             <h3>{table_name}</h3>
             <div class="table-wrapper">
-                {process_table(table_data).to_html(classes='table-view', index=False, escape=False)}
+                {ColumnarTable(table_data).page_html(page_size=None)}
             </div>
         </div>
         """
         for table_name, table_data in tables_data.items() if table_data
     )
-    
-    return HTML(f"{styles}{tables_html}")
 
-def segment_view(document_image_uris, inference_result):
+def create_table_view(tables_data, page_size=DEFAULT_PAGE_SIZE):
+    # One page of rows at a time; paging and sorting re-render only that page
+    return widgets.VBox([widgets.HTML(TABLE_VIEW_STYLES)] + [
+        PagedTableView(ColumnarTable(table_data), title=table_name, page_size=page_size,
+                       layout=widgets.Layout(margin='20px'))
+        for table_name, table_data in tables_data.items() if table_data
+    ])
+
+def segment_view(document_image_uris, inference_result, page_index=0, tiled=False,
+                 custom_output=None, standard_output=None, overlay_width=1200):
     # Create the layout with top alignment
     main_hbox_layout = widgets.Layout(
         width='100%',
@@ -316,13 +388,25 @@ def segment_view(document_image_uris, inference_result):
         align_items='stretch',
         margin='0'
     )
-    image_widget = widgets.Image(
-        value=b'',
-        format='png',
-        width='auto',
-        height='auto'
-    )
-    image_widget.value = load_image(uri=document_image_uris[0])
+    # One image per page (e.g. rectified page images), or a single PDF to take the page from
+    if len(document_image_uris) > 1:
+        image_bytes = load_image(uri=document_image_uris[page_index])
+    else:
+        image_bytes = load_image(uri=document_image_uris[0], page_index=page_index)
+    if custom_output or standard_output:
+        # Draw every extracted field / element box on the page, colour-coded by confidence
+        image_bytes = overlay_page(image_bytes, custom_output, standard_output,
+                                   page_index=page_index, max_width=overlay_width)
+    if tiled:
+        # Large scans: send only the tiles in view instead of the full-resolution page
+        image_widget = TiledImageViewer(get_pyramid(image_bytes))
+    else:
+        image_widget = widgets.Image(
+            value=image_bytes,
+            format='png',
+            width='auto',
+            height='auto'
+        )
     image_container = widgets.VBox(
         children=[image_widget],
         layout=widgets.Layout(
@@ -340,8 +424,11 @@ def segment_view(document_image_uris, inference_result):
     )
     
     
-    # Create tabs for different views
-    tab = widgets.Tab(
+    # Create tabs for different views; each view is rendered when its tab is first opened
+    tab = lazy_tabs(
+        [lambda: create_form_view(inference_result['forms']),
+         lambda: create_table_view(inference_result['tables'])],
+        ['Key Value Pairs', 'Tables'],
         layout=widgets.Layout(
             width='40%',
             flex='0 0 40%',
@@ -349,18 +436,6 @@ def segment_view(document_image_uris, inference_result):
             height='auto'
         )
     )
-    form_view = widgets.Output()
-    table_view = widgets.Output()
-    
-    with form_view:
-        display(create_form_view(inference_result['forms']))
-        
-    with table_view:
-        display(create_table_view(inference_result['tables']))
-    
-    tab.children = [form_view, table_view]
-    tab.set_title(0, 'Key Value Pairs')
-    tab.set_title(1, 'Tables')
 
     
     # Add custom CSS for scrollable container
@@ -0,0 +1,184 @@
+import base64
+import html
+import io
+import os
+
+from PIL import Image
+
+from .display_functions import FORM_VIEW_STYLES, TABLE_VIEW_STYLES, render_form_html, render_tables_html
+
+
+REPORT_STYLES = """
+    <style>
+        body{font-family:sans-serif;margin:20px;color:#333}
+        .summary{border-collapse:collapse;margin-bottom:12px}
+        .summary th,.summary td{border:1px solid #dee2e6;padding:4px 8px;font-size:.85em;text-align:left}
+        .summary th{background-color:#f8f9fa}
+        .document{display:flex;gap:16px;align-items:flex-start}
+        .document img{border:1px solid #888}
+        .pager a{margin:0 6px}
+    </style>
+    """
+
+# Form rows from render_form_html call handleClick; in the static report a click
+# only highlights the row (there is no page image to draw the bounding box on)
+REPORT_SCRIPT = """
+    <script>
+        function handleClick(event) {
+            var row = event.currentTarget;
+            var selected = document.querySelectorAll('[data-selected]');
+            for (var i = 0; i < selected.length; i++) {
+                selected[i].style.backgroundColor = '';
+                selected[i].removeAttribute('data-selected');
+            }
+            row.style.backgroundColor = '#e0e0e0';
+            row.setAttribute('data-selected', '');
+        }
+    </script>
+    """
+
+
+def _summary(custom_output):
+    # Same fields as helper_functions.get_summaries, for a single output
+    if not custom_output:
+        return {}
+    return {
+        'page_indices': custom_output.get('split_document', {}).get('page_indices'),
+        'matched_blueprint_name': custom_output.get('matched_blueprint', {}).get('name'),
+        'confidence': custom_output.get('matched_blueprint', {}).get('confidence'),
+        'document_class_type': custom_output.get('document_class', {}).get('type')
+    }
+
+
+def _thumbnail(image_bytes, width):
+    image = Image.open(io.BytesIO(image_bytes))
+    image.thumbnail((width, width * 4))
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    buffered = io.BytesIO()
+    image.save(buffered, format='JPEG', quality=75)
+    return f'<img src="data:image/jpeg;base64,{base64.b64encode(buffered.getvalue()).decode()}" width="{image.width}">'
+
+
+def _summary_table(rows, columns):
+    header = ''.join(f'<th>{html.escape(c)}</th>' for c in columns)
+    body = ''.join('<tr>' + ''.join(f'<td>{cell}</td>' for cell in row) + '</tr>' for row in rows)
+    return f'<table class="summary"><tr>{header}</tr>{body}</table>'
+
+
+class StaticHtmlReport:
+    """
+    Streams a static HTML report for a batch of processed documents to disk.
+
+    Each `add_document` call writes that document's page (summary, form view,
+    table view and thumbnail) straight to `output_dir/documents/`; only the rows of
+    the current index page are kept in memory. Index pages hold `page_size`
+    documents each and link to their neighbours; `index.html` is the first page.
+
+    Example:
+        with StaticHtmlReport('report') as report:
+            for name, custom_output, image_bytes in results:
+                report.add_document(name, custom_output, transform_custom_output(...), image_bytes)
+    """
+
+    def __init__(self, output_dir, title='Bedrock Data Automation batch report', page_size=100,
+                 thumbnail_width=120, page_image_width=600):
+        self.output_dir = output_dir
+        self.title = title
+        self.page_size = page_size
+        self.thumbnail_width = thumbnail_width
+        self.page_image_width = page_image_width
+        self.document_count = 0
+        self.index_page = 0
+        self.index_rows = []
+        self.pending_page = None
+        self.index_columns = ['#', 'document', 'page']
+        self.closed = False
+        os.makedirs(os.path.join(output_dir, 'documents'), exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _index_path(self, page):
+        return 'index.html' if page == 0 else f'index_{page}.html'
+
+    def add_document(self, name, custom_output=None, inference_result=None, image_bytes=None):
+        """
+        Write one document section and add it to the current index page.
+
+        Args:
+            name (str): Document or segment name
+            custom_output (dict): BDA custom output, used for the summary
+            inference_result (dict): `transform_custom_output` result with `forms` and `tables`
+            image_bytes (bytes): Encoded page image for the thumbnail
+        """
+        doc_file = f'documents/{self.document_count:06d}.html'
+        summary = _summary(custom_output)
+        columns = list(summary.keys()) or ['page_indices', 'matched_blueprint_name', 'confidence', 'document_class_type']
+        summary_row = [html.escape(str(summary.get(c, ''))) for c in columns]
+
+        with open(os.path.join(self.output_dir, doc_file), 'w', encoding='utf-8') as f:
+            f.write(f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html.escape(name)}</title>')
+            f.write(REPORT_STYLES + FORM_VIEW_STYLES + TABLE_VIEW_STYLES + REPORT_SCRIPT + '</head><body>')
+            f.write(f'<p><a href="../{self._index_path(self.index_page)}">&larr; Index</a></p>')
+            f.write(f'<h2>{html.escape(name)}</h2>')
+            f.write(_summary_table([summary_row], columns))
+            f.write('<div class="document">')
+            if image_bytes:
+                f.write(_thumbnail(image_bytes, self.page_image_width))
+            if inference_result:
+                f.write('<div>')
+                f.write(render_form_html(inference_result.get('forms', {})))
+                f.write(render_tables_html(inference_result.get('tables', {})))
+                f.write('</div>')
+            f.write('</div></body></html>')
+
+        thumbnail = _thumbnail(image_bytes, self.thumbnail_width) if image_bytes else ''
+        link = f'<a href="{doc_file}">{html.escape(name)}</a>'
+        self.index_rows.append([str(self.document_count), link, thumbnail] + summary_row)
+        self.index_columns = ['#', 'document', 'page'] + columns
+        self.document_count += 1
+
+        if len(self.index_rows) == self.page_size:
+            # Hold a full page back until we know whether another page follows
+            self._flush_pending(has_next=True)
+            self.pending_page = (self.index_page, self.index_rows)
+            self.index_page += 1
+            self.index_rows = []
+
+    def _write_index_page(self, page, rows, has_next):
+        pager = []
+        if page > 0:
+            pager.append(f'<a href="{self._index_path(page - 1)}">&larr; Previous</a>')
+        pager.append(f'Page {page + 1}')
+        if has_next:
+            pager.append(f'<a href="{self._index_path(page + 1)}">Next &rarr;</a>')
+        pager_html = f'<div class="pager">{" ".join(pager)}</div>'
+        with open(os.path.join(self.output_dir, self._index_path(page)), 'w', encoding='utf-8') as f:
+            f.write(f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{html.escape(self.title)}</title>')
+            f.write(REPORT_STYLES + '</head><body>')
+            f.write(f'<h1>{html.escape(self.title)}</h1>{pager_html}')
+            f.write(_summary_table(rows, self.index_columns))
+            f.write(f'{pager_html}</body></html>')
+
+    def _flush_pending(self, has_next):
+        if self.pending_page:
+            page, rows = self.pending_page
+            self._write_index_page(page, rows, has_next)
+            self.pending_page = None
+
+    def close(self):
+        """Write the remaining index pages; returns the path of `index.html`. Later calls do nothing."""
+        if self.closed:
+            return os.path.join(self.output_dir, 'index.html')
+        self.closed = True
+        if self.index_rows or not self.pending_page:
+            self._flush_pending(has_next=True)
+            self._write_index_page(self.index_page, self.index_rows, has_next=False)
+        else:
+            self._flush_pending(has_next=False)
+        self.index_rows = []
+        return os.path.join(self.output_dir, 'index.html')
@@ -0,0 +1,149 @@
+import hashlib
+import io
+import math
+from collections import OrderedDict
+
+import ipywidgets as widgets
+from PIL import Image
+
+
+TILE_SIZE = 256
+MAX_CACHED_PYRAMIDS = 16
+
+_pyramid_cache = OrderedDict()
+
+
+class ImagePyramid:
+    """
+    Downscaled levels of a page image, cut into fixed-size tiles.
+
+    Level 0 is full resolution and every following level halves the size until the
+    page fits in a single tile. Levels are built once; each tile is encoded the
+    first time it is requested and then kept.
+    """
+
+    def __init__(self, image, tile_size=TILE_SIZE, format='JPEG', quality=80):
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        self.tile_size = tile_size
+        self.format = format
+        self.quality = quality
+        self.levels = [image]
+        while max(self.levels[-1].size) > tile_size:
+            previous = self.levels[-1]
+            self.levels.append(previous.resize(
+                (max(1, previous.width // 2), max(1, previous.height // 2)), Image.LANCZOS))
+        self.tiles = {}
+
+    @property
+    def level_count(self):
+        return len(self.levels)
+
+    def level_size(self, level):
+        return self.levels[level].size
+
+    def grid_size(self, level):
+        width, height = self.level_size(level)
+        return math.ceil(width / self.tile_size), math.ceil(height / self.tile_size)
+
+    def get_tile(self, level, col, row):
+        """Encoded bytes of one tile; edge tiles are smaller than `tile_size`."""
+        key = (level, col, row)
+        if key not in self.tiles:
+            image = self.levels[level]
+            left, top = col * self.tile_size, row * self.tile_size
+            tile = image.crop((left, top, min(left + self.tile_size, image.width),
+                               min(top + self.tile_size, image.height)))
+            tile_io = io.BytesIO()
+            tile.save(tile_io, format=self.format, quality=self.quality)
+            self.tiles[key] = tile_io.getvalue()
+        return self.tiles[key]
+
+
+def get_pyramid(image_bytes, tile_size=TILE_SIZE):
+    """Pyramid for encoded page bytes, reused across calls for the same content."""
+    key = (hashlib.sha1(image_bytes).hexdigest(), tile_size)
+    if key in _pyramid_cache:
+        _pyramid_cache.move_to_end(key)
+        return _pyramid_cache[key]
+    pyramid = ImagePyramid(Image.open(io.BytesIO(image_bytes)), tile_size=tile_size)
+    _pyramid_cache[key] = pyramid
+    while len(_pyramid_cache) > MAX_CACHED_PYRAMIDS:
+        _pyramid_cache.popitem(last=False)
+    return pyramid
+
+
+class TiledImageViewer(widgets.VBox):
+    """
+    Image viewer that only sends the tiles inside its viewport to the browser.
+
+    Starts at the coarsest level that fills the viewport; zooming in moves to a
+    finer level and panning shifts the visible tile window.
+    """
+
+    def __init__(self, pyramid, viewport_tiles=(3, 4), **kwargs):
+        self.pyramid = pyramid
+        self.viewport_cols, self.viewport_rows = viewport_tiles
+        self.level = self._initial_level()
+        self.col = 0
+        self.row = 0
+        self.bytes_sent = 0
+
+        tile_px = f'{pyramid.tile_size}px'
+        self.tile_widgets = [widgets.Image(format=pyramid.format.lower(), layout=widgets.Layout(max_width=tile_px, max_height=tile_px))
+                             for _ in range(self.viewport_cols * self.viewport_rows)]
+        self.grid = widgets.GridBox(self.tile_widgets, layout=widgets.Layout(
+            grid_template_columns=f'repeat({self.viewport_cols}, {tile_px})', grid_gap='0px'))
+
+        buttons = []
+        for label, handler in [('−', self.zoom_out), ('+', self.zoom_in),
+                               ('←', lambda: self.pan(-1, 0)), ('→', lambda: self.pan(1, 0)),
+                               ('↑', lambda: self.pan(0, -1)), ('↓', lambda: self.pan(0, 1))]:
+            button = widgets.Button(description=label, layout=widgets.Layout(width='36px'))
+            button.on_click(lambda _, handler=handler: handler())
+            buttons.append(button)
+        self.status = widgets.Label()
+        super().__init__([widgets.HBox(buttons + [self.status]), self.grid], **kwargs)
+        self.refresh()
+
+    def _initial_level(self):
+        for level in range(self.pyramid.level_count):
+            cols, rows = self.pyramid.grid_size(level)
+            if cols <= self.viewport_cols and rows <= self.viewport_rows:
+                return level
+        return self.pyramid.level_count - 1
+
+    def zoom_in(self):
+        if self.level > 0:
+            self.level -= 1
+            self.col, self.row = self.col * 2, self.row * 2
+            self.refresh()
+
+    def zoom_out(self):
+        if self.level < self.pyramid.level_count - 1:
+            self.level += 1
+            self.col, self.row = self.col // 2, self.row // 2
+            self.refresh()
+
+    def pan(self, d_col, d_row):
+        cols, rows = self.pyramid.grid_size(self.level)
+        self.col = min(max(self.col + d_col, 0), max(cols - self.viewport_cols, 0))
+        self.row = min(max(self.row + d_row, 0), max(rows - self.viewport_rows, 0))
+        self.refresh()
+
+    def refresh(self):
+        cols, rows = self.pyramid.grid_size(self.level)
+        for i, tile_widget in enumerate(self.tile_widgets):
+            col = self.col + i % self.viewport_cols
+            row = self.row + i // self.viewport_cols
+            if col < cols and row < rows:
+                value = self.pyramid.get_tile(self.level, col, row)
+                tile_widget.layout.display = None
+            else:
+                value = b''
+                tile_widget.layout.display = 'none'
+            if tile_widget.value != value:
+                tile_widget.value = value
+                self.bytes_sent += len(value)
+        width, height = self.pyramid.level_size(self.level)
+        self.status.value = f'level {self.level} ({width}x{height}), {self.bytes_sent / 1024:.0f} KB sent'
@@ -0,0 +1,232 @@
+import io
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2.generic import NameObject, NumberObject
+
+
+TARGET_DPI = 150
+MAX_EDGE = 2000
+JPEG_QUALITY = 85
+# An image is treated as grayscale when 99% of its pixels have a channel spread below this
+MAX_GRAY_CHROMA = 12
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.tif', '.tiff'}
+
+
+def is_effectively_gray(image, max_chroma=MAX_GRAY_CHROMA):
+    """True when converting to grayscale would not lose colour information."""
+    if image.mode in ('L', '1'):
+        return True
+    sample = np.asarray(image.convert('RGB').resize((128, 128)), dtype=np.int16)
+    chroma = sample.max(axis=2) - sample.min(axis=2)
+    return np.percentile(chroma, 99) < max_chroma
+
+
+def _scale(width, height, dpi=None, target_dpi=TARGET_DPI, max_edge=MAX_EDGE):
+    scale = 1.0
+    if dpi and target_dpi and dpi > target_dpi:
+        scale = target_dpi / dpi
+    if max_edge and max(width, height) * scale > max_edge:
+        scale = max_edge / max(width, height)
+    return scale
+
+
+def _prepare(image, scale, grayscale):
+    if grayscale and is_effectively_gray(image):
+        image = image.convert('L')
+    elif image.mode not in ('L', 'RGB'):
+        image = image.convert('RGB')
+    if scale < 1.0:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS, reducing_gap=2.0)
+    return image
+
+
+def _decode_pdf_image(xobject):
+    """PIL image for JPEG and 8-bit Flate gray/RGB image XObjects; None for anything else."""
+    if xobject.get('/BitsPerComponent') != 8 or '/Decode' in xobject or '/ImageMask' in xobject:
+        return None
+    image_filter = xobject.get('/Filter')
+    if isinstance(image_filter, list):
+        image_filter = image_filter[0] if len(image_filter) == 1 else None
+    if image_filter == '/DCTDecode':
+        image = Image.open(io.BytesIO(xobject._data))
+        return image if image.mode in ('L', 'RGB') else None
+    if image_filter == '/FlateDecode':
+        color_space = xobject.get('/ColorSpace')
+        mode = {'/DeviceGray': 'L', '/DeviceRGB': 'RGB'}.get(color_space)
+        if mode:
+            return Image.frombytes(mode, (xobject['/Width'], xobject['/Height']), xobject.get_data())
+    return None
+
+
+def _normalize_pdf_image(xobject, page_width_in, target_dpi, max_edge, grayscale, quality):
+    image = _decode_pdf_image(xobject)
+    if image is None:
+        return False
+    # Effective resolution if the image spans the page width (it can only be higher)
+    dpi = image.width / page_width_in if page_width_in else None
+    image = _prepare(image, _scale(image.width, image.height, dpi, target_dpi, max_edge), grayscale)
+
+    if xobject.get('/Filter') in ('/DCTDecode', ['/DCTDecode']):
+        buffered = io.BytesIO()
+        image.save(buffered, format='JPEG', quality=quality, optimize=True)
+        data, image_filter = buffered.getvalue(), '/DCTDecode'
+    else:
+        # Keep lossless sources lossless
+        data, image_filter = zlib.compress(image.tobytes(), 9), '/FlateDecode'
+    if len(data) >= len(xobject._data):
+        return False
+
+    xobject._data = data
+    xobject[NameObject('/Filter')] = NameObject(image_filter)
+    xobject[NameObject('/Width')] = NumberObject(image.width)
+    xobject[NameObject('/Height')] = NumberObject(image.height)
+    xobject[NameObject('/ColorSpace')] = NameObject('/DeviceGray' if image.mode == 'L' else '/DeviceRGB')
+    if '/DecodeParms' in xobject:
+        del xobject['/DecodeParms']
+    return True
+
+
+def normalize_pdf(input_path, output_path, target_dpi=TARGET_DPI, max_edge=MAX_EDGE, grayscale=True, quality=JPEG_QUALITY):
+    """
+    Rewrite a PDF with downsampled, re-compressed images.
+
+    Only the pages and the objects they reference are written, so unused objects,
+    page thumbnails and orphaned resources are dropped.
+    Image streams are replaced only when the result is smaller.
+
+    Returns:
+        int: Number of images replaced
+    """
+    reader = PdfReader(input_path)
+    writer = PdfWriter()
+    replaced = 0
+    seen = set()
+    for reader_page in reader.pages:
+        page = writer.add_page(reader_page)
+        if '/Thumb' in page:
+            del page['/Thumb']
+        page_width_in = float(page.mediabox.width) / 72
+        resources = page.get('/Resources')
+        xobjects = resources.get_object().get('/XObject') if resources else None
+        for reference in (xobjects.get_object().values() if xobjects else []):
+            xobject = reference.get_object()
+            if id(xobject) in seen or xobject.get('/Subtype') != '/Image':
+                continue
+            seen.add(id(xobject))
+            replaced += _normalize_pdf_image(xobject, page_width_in, target_dpi, max_edge, grayscale, quality)
+    with open(output_path, 'wb') as f:
+        writer.write(f)
+    return replaced
+
+
+def normalize_image(input_path, output_path, target_dpi=TARGET_DPI, max_edge=MAX_EDGE, grayscale=True, quality=JPEG_QUALITY):
+    """Downsample, optionally convert to grayscale and re-encode an image file as JPEG."""
+    image = Image.open(input_path)
+    dpi = image.info.get('dpi', (None,))[0]
+    # Files without real resolution metadata (often 72) are only limited by max_edge
+    image = _prepare(image, _scale(image.width, image.height, dpi if dpi and dpi > 72 else None, target_dpi, max_edge), grayscale)
+    image.save(output_path, format='JPEG', quality=quality, optimize=True)
+    return 1
+
+
+def normalize_file(input_path, output_dir, **options):
+    """
+    Normalize one PDF or image into `output_dir`.
+
+    Falls back to the original file when normalization does not make it smaller
+    or the format is not supported.
+
+    Returns:
+        dict: Input/output paths, sizes before and after and processing time
+    """
+    start_time = time.time()
+    name, extension = os.path.splitext(os.path.basename(input_path))
+    extension = extension.lower()
+    if extension == '.pdf':
+        output_path = os.path.join(output_dir, f'{name}.pdf')
+        normalize = normalize_pdf
+    elif extension in IMAGE_EXTENSIONS:
+        output_path = os.path.join(output_dir, f'{name}.jpg')
+        normalize = normalize_image
+    else:
+        output_path, normalize = input_path, None
+
+    images = 0
+    if normalize:
+        images = normalize(input_path, output_path, **options)
+        if os.path.getsize(output_path) >= os.path.getsize(input_path):
+            os.remove(output_path)
+            output_path = input_path
+    return {
+        'input': input_path,
+        'output': output_path,
+        'images_replaced': images,
+        'bytes_before': os.path.getsize(input_path),
+        'bytes_after': os.path.getsize(output_path),
+        'seconds': time.time() - start_time
+    }
+
+
+def normalize_files(input_paths, output_dir, workers=None, **options):
+    """
+    Normalize several documents in a process pool before uploading them.
+
+    Args:
+        input_paths (list): PDF or image files
+        output_dir (str): Directory for the normalized files
+        workers (int): Worker processes; defaults to the CPU count
+        **options: target_dpi, max_edge, grayscale, quality
+
+    Returns:
+        list: One `normalize_file` report per input, in input order
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    input_paths = list(input_paths)
+    workers = workers or min(os.cpu_count() or 1, len(input_paths)) or 1
+    if workers == 1:
+        reports = [normalize_file(path, output_dir, **options) for path in input_paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(normalize_file, path, output_dir, **options) for path in input_paths]
+            reports = [future.result() for future in futures]
+
+    saved = sum(r['bytes_before'] - r['bytes_after'] for r in reports)
+    before = sum(r['bytes_before'] for r in reports)
+    print(f"Normalized {len(reports)} files: {before / 1e6:.2f} MB -> {(before - saved) / 1e6:.2f} MB "
+          f"({saved / before:.0%} saved)" if before else "No files to normalize")
+    return reports
+
+
+def compare_upload_latency(s3_client, reports, bucket, prefix):
+    """
+    Upload the original and normalized file of each report and time both, to see
+    what normalization saves end to end (normalization time included).
+
+    Returns:
+        list: Per file upload seconds for the original and normalized versions
+    """
+    results = []
+    for report in reports:
+        name = os.path.basename(report['input'])
+        start_time = time.time()
+        s3_client.upload_file(report['input'], bucket, f'{prefix}/original/{name}')
+        original_seconds = time.time() - start_time
+        start_time = time.time()
+        s3_client.upload_file(report['output'], bucket, f'{prefix}/normalized/{os.path.basename(report["output"])}')
+        normalized_seconds = time.time() - start_time + report['seconds']
+        results.append({
+            'file': name,
+            'bytes_before': report['bytes_before'],
+            'bytes_after': report['bytes_after'],
+            'upload_seconds_original': round(original_seconds, 3),
+            'normalize_and_upload_seconds': round(normalized_seconds, 3)
+        })
+    return results
@@ -0,0 +1,123 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+try:
+    from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+except ImportError:
+    convert_from_bytes = None
+    pdfinfo_from_bytes = None
+
+
+DEFAULT_DPI = 100
+MAX_CACHED_PAGES = 64
+
+_page_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def document_hash(content):
+    return hashlib.sha1(content).hexdigest()
+
+
+def get_rasterizer():
+    """
+    Name of the rasterizer in use. pypdfium2 (already used in notebook 21) renders
+    in-process and opens only the requested page; pdf2image is the fallback and is
+    limited to the requested range with first_page/last_page.
+    """
+    if pdfium is not None:
+        return 'pypdfium2'
+    if convert_from_bytes is not None:
+        return 'pdf2image'
+    raise ImportError('Install pypdfium2 or pdf2image to render PDF pages')
+
+
+def pdf_page_count(content):
+    if get_rasterizer() == 'pypdfium2':
+        pdf = pdfium.PdfDocument(content)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    return pdfinfo_from_bytes(content)['Pages']
+
+
+def _render_pdfium(content, page_indices, width, dpi):
+    pdf = pdfium.PdfDocument(content)
+    try:
+        images = []
+        for page_index in page_indices:
+            page = pdf[page_index]
+            scale = width / page.get_width() if width else dpi / 72
+            images.append(page.render(scale=scale).to_pil())
+            page.close()
+        return images
+    finally:
+        pdf.close()
+
+
+def _render_pdf2image(content, page_indices, width, dpi):
+    images = []
+    for page_index in page_indices:
+        images += convert_from_bytes(
+            content,
+            dpi=dpi,
+            first_page=page_index + 1,
+            last_page=page_index + 1,
+            size=(width, None) if width else None
+        )
+    return images
+
+
+def render_pdf_pages(content, page_indices, width=None, dpi=DEFAULT_DPI):
+    """
+    Rasterize only the requested pages of a PDF.
+
+    Args:
+        content (bytes): PDF file content
+        page_indices (list): 0-based page indices to render
+        width (int): Target width in pixels; overrides `dpi` when set
+        dpi (int): Target resolution when no width is given
+
+    Returns:
+        list: PIL images in the order of `page_indices`
+    """
+    if get_rasterizer() == 'pypdfium2':
+        return _render_pdfium(content, page_indices, width, dpi)
+    return _render_pdf2image(content, page_indices, width, dpi)
+
+
+def render_pdf_page_bytes(content, page_index=0, width=None, dpi=DEFAULT_DPI, format='JPEG', doc_hash=None):
+    """
+    Encoded image bytes for one PDF page, cached by (document hash, page, size).
+    """
+    key = (doc_hash or document_hash(content), page_index, width, None if width else dpi, format)
+    with _cache_lock:
+        if key in _page_cache:
+            _page_cache.move_to_end(key)
+            return _page_cache[key]
+
+    image = render_pdf_pages(content, [page_index], width=width, dpi=dpi)[0]
+    if format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    img_io = io.BytesIO()
+    image.save(img_io, format=format)
+    value = img_io.getvalue()
+
+    with _cache_lock:
+        _page_cache[key] = value
+        while len(_page_cache) > MAX_CACHED_PAGES:
+            _page_cache.popitem(last=False)
+    return value
+
+
+def clear_page_cache():
+    with _cache_lock:
+        _page_cache.clear()
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+
+def stable_hash(*parts):
+    """
+    Hash of JSON-like data that does not depend on object identity. Dict order is
+    part of the hash, since the views render dicts in insertion order.
+    """
+    payload = json.dumps(parts, separators=(',', ':'), default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=20).hexdigest()
+
+
+def _fingerprint(data):
+    # Cheap check that an object seen before has not been replaced at the top level
+    if isinstance(data, dict):
+        return type(data), len(data), tuple(data)
+    if isinstance(data, (list, tuple)):
+        return type(data), len(data), tuple(map(id, data))
+    return type(data), id(data)
+
+
+class RenderCache:
+    """
+    LRU cache of rendered HTML keyed by a hash of the view name, input data and view options.
+
+    Hashing a large payload costs more than rendering it, so the content hash of
+    an object is computed once and then looked up by object identity (checked
+    with a shallow fingerprint). Data passed to the views is treated as
+    immutable: nested changes to an object that was already rendered are not seen.
+
+    An optional disk tier (`disk_dir`) keeps rendered views across kernel restarts;
+    entries evicted from memory are still served from disk.
+    """
+
+    def __init__(self, max_entries=256, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.entries = OrderedDict()
+        # id(data) -> (data, fingerprint, content hash); holds a reference so the id is not reused
+        self.content_keys = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f'{key}.pkl')
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            with open(self._disk_path(key), 'rb') as f:
+                value = pickle.load(f)
+            with self.lock:
+                self.disk_hits += 1
+            self._put_memory(key, value)
+            return value
+        return None
+
+    def _put_memory(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def put(self, key, value):
+        self._put_memory(key, value)
+        if self.disk_dir:
+            tmp_path = self._disk_path(key) + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f)
+            os.replace(tmp_path, self._disk_path(key))
+
+    def content_key(self, data):
+        """Content hash of `data`, reused for the same unchanged object."""
+        fingerprint = _fingerprint(data)
+        with self.lock:
+            known = self.content_keys.get(id(data))
+            if known and known[0] is data and known[1] == fingerprint:
+                self.content_keys.move_to_end(id(data))
+                return known[2]
+        key = stable_hash(data)
+        with self.lock:
+            self.content_keys[id(data)] = (data, fingerprint, key)
+            while len(self.content_keys) > self.max_entries:
+                self.content_keys.popitem(last=False)
+        return key
+
+    def get_or_render(self, view_name, data, render, **options):
+        """Return the cached rendering of `data`, calling `render()` only on a miss."""
+        key = stable_hash(view_name, self.content_key(data), options)
+        value = self.get(key)
+        if value is None:
+            with self.lock:
+                self.misses += 1
+            value = render()
+            self.put(key, value)
+        return value
+
+    def clear(self, disk=False):
+        with self.lock:
+            self.entries.clear()
+            self.content_keys.clear()
+            self.hits = self.disk_hits = self.misses = 0
+        if disk and self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(self.disk_dir, name))
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0
+        }
+
+
+render_cache = RenderCache()
+
+
+def configure_render_cache(max_entries=256, disk_dir=None):
+    """Replace the shared cache used by the view helpers, e.g. to enable the disk tier."""
+    global render_cache
+    render_cache = RenderCache(max_entries=max_entries, disk_dir=disk_dir)
+    return render_cache
+
+
+def get_render_cache():
+    return render_cache
@@ -0,0 +1,137 @@
+import numpy as np
+
+
+AUTO_ACCEPT = 'auto_accept'
+REVIEW = 'review'
+REJECT = 'reject'
+
+DEFAULT_THRESHOLDS = {'accept': 0.9, 'reject': 0.3}
+
+
+def flatten_confidences(custom_outputs):
+    """
+    Flatten the per-field confidences buried in `explainability_info` into columns.
+
+    Table fields are reported once per row under a `table[].column` field name so
+    thresholds apply to a column regardless of the row count.
+
+    Args:
+        custom_outputs (list): Custom output JSON for each segment of a batch
+
+    Returns:
+        dict: Equal-length NumPy arrays `document`, `blueprint`, `field` and `confidence`
+    """
+    documents, blueprints, fields, confidences = [], [], [], []
+
+    def walk(info, prefix, doc_idx, blueprint):
+        if isinstance(info, list):
+            for item in info:
+                walk(item, f'{prefix}[]', doc_idx, blueprint)
+        elif isinstance(info, dict):
+            if 'confidence' in info:
+                documents.append(doc_idx)
+                blueprints.append(blueprint)
+                fields.append(prefix)
+                confidences.append(info['confidence'])
+                return
+            for key, value in info.items():
+                walk(value, f'{prefix}.{key}' if prefix else key, doc_idx, blueprint)
+
+    for doc_idx, output in enumerate(custom_outputs):
+        if not output:
+            continue
+        blueprint = output.get('matched_blueprint', {}).get('name', '')
+        explainability_info = output.get('explainability_info', [])
+        if isinstance(explainability_info, dict):
+            explainability_info = [explainability_info]
+        for info in explainability_info:
+            walk(info, '', doc_idx, blueprint)
+
+    return {
+        'document': np.asarray(documents, dtype=np.int64),
+        'blueprint': np.asarray(blueprints, dtype=object),
+        'field': np.asarray(fields, dtype=object),
+        'confidence': np.asarray(confidences, dtype=np.float64)
+    }
+
+
+def _threshold_arrays(keys, thresholds, default):
+    """Resolve (accept, reject) thresholds for each unique (blueprint, field) key."""
+    accept = np.empty(len(keys), dtype=np.float64)
+    reject = np.empty(len(keys), dtype=np.float64)
+    for i, (blueprint, field) in enumerate(keys):
+        blueprint_thresholds = thresholds.get(blueprint, {})
+        resolved = blueprint_thresholds.get(field, blueprint_thresholds.get('*', default))
+        if not isinstance(resolved, dict):
+            resolved = {'accept': resolved, 'reject': default['reject']}
+        accept[i] = resolved.get('accept', default['accept'])
+        reject[i] = resolved.get('reject', default['reject'])
+    return accept, reject
+
+
+def route(columns, thresholds=None, default=DEFAULT_THRESHOLDS):
+    """
+    Partition a batch of field confidences into auto-accept, review and reject.
+
+    `thresholds` maps blueprint name -> field name (or '*' for all fields) -> either
+    an accept threshold or a dict with `accept` and `reject` thresholds. A field is
+    auto-accepted at `confidence >= accept`, rejected at `confidence < reject`, and
+    sent to human review otherwise. Missing confidences (NaN) always go to review.
+
+    Only the distinct (blueprint, field) pairs are resolved in Python; the
+    comparisons themselves run as NumPy array operations over the whole batch.
+
+    Args:
+        columns (dict): Output of `flatten_confidences`
+        thresholds (dict): Per-blueprint, per-field thresholds
+        default (dict): Thresholds for fields without a specific entry
+
+    Returns:
+        dict: Row indices per partition, the per-row decision and per-field rejection rates
+    """
+    thresholds = thresholds or {}
+    confidence = columns['confidence']
+    n = len(confidence)
+    if n == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return {AUTO_ACCEPT: empty, REVIEW: empty, REJECT: empty,
+                'decision': np.empty(0, dtype=object), 'field_rejection_rates': {}}
+
+    pair = np.char.add(np.char.add(columns['blueprint'].astype(str), '\x1f'), columns['field'].astype(str))
+    unique_pairs, pair_codes = np.unique(pair, return_inverse=True)
+    keys = [tuple(p.split('\x1f', 1)) for p in unique_pairs]
+    accept, reject = _threshold_arrays(keys, thresholds, default)
+
+    row_accept = accept[pair_codes]
+    row_reject = reject[pair_codes]
+    accepted = confidence >= row_accept
+    rejected = confidence < row_reject
+    reviewed = ~(accepted | rejected)
+
+    decision = np.full(n, REVIEW, dtype=object)
+    decision[accepted] = AUTO_ACCEPT
+    decision[rejected] = REJECT
+
+    totals = np.bincount(pair_codes, minlength=len(keys))
+    rejections = np.bincount(pair_codes, weights=rejected, minlength=len(keys))
+    field_rejection_rates = {key: float(rejections[i] / totals[i]) for i, key in enumerate(keys)}
+
+    return {
+        AUTO_ACCEPT: np.flatnonzero(accepted),
+        REVIEW: np.flatnonzero(reviewed),
+        REJECT: np.flatnonzero(rejected),
+        'decision': decision,
+        'field_rejection_rates': field_rejection_rates
+    }
+
+
+def route_custom_outputs(custom_outputs, thresholds=None, default=DEFAULT_THRESHOLDS):
+    """Flatten and route a batch of custom outputs; returns (columns, routing)."""
+    columns = flatten_confidences(custom_outputs)
+    return columns, route(columns, thresholds=thresholds, default=default)
+
+
+def documents_for_review(columns, routing):
+    """Indices of documents with at least one field in the review or reject partition."""
+    flagged = np.concatenate([routing[REVIEW], routing[REJECT]])
+    return np.unique(columns['document'][flagged])
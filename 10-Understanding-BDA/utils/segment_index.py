@@ -0,0 +1,170 @@
+import json
+import sqlite3
+import time
+from datetime import datetime
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    completed_at REAL NOT NULL,
+    segment_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    job_id TEXT NOT NULL,
+    segment_index INTEGER NOT NULL,
+    matched_blueprint_name TEXT,
+    document_class_type TEXT,
+    confidence REAL,
+    first_page INTEGER,
+    last_page INTEGER,
+    page_indices TEXT,
+    completed_at REAL NOT NULL,
+    PRIMARY KEY (job_id, segment_index)
+);
+CREATE INDEX IF NOT EXISTS idx_segments_blueprint ON segments (matched_blueprint_name, confidence, completed_at);
+CREATE INDEX IF NOT EXISTS idx_segments_class ON segments (document_class_type, confidence, completed_at);
+CREATE INDEX IF NOT EXISTS idx_segments_completed ON segments (completed_at);
+"""
+
+
+def _to_epoch(value):
+    if value is None:
+        return time.time()
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return float(value)
+
+
+class SegmentIndex:
+    """
+    Persistent SQLite index of the per-segment summaries produced by `get_summaries`.
+
+    Every completed job is added once with `add_job`; re-adding a job replaces its rows,
+    so the index can be fed incrementally as new jobs land without re-reading S3.
+
+    Example:
+        index = SegmentIndex('segments.db')
+        index.add_job(job_id, helper_functions.get_summaries(custom_outputs))
+        index.query(blueprint='W2', max_confidence=0.8, since=time.time() - 7 * 86400)
+    """
+
+    def __init__(self, db_path='segment_index.db'):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def has_job(self, job_id):
+        return self.conn.execute('SELECT 1 FROM jobs WHERE job_id = ?', (job_id,)).fetchone() is not None
+
+    def add_job(self, job_id, summaries, completed_at=None):
+        """
+        Add (or replace) the segments of one completed job.
+
+        Args:
+            job_id (str): BDA job id or invocation ARN
+            summaries (list): Output of `get_summaries` for the job's custom outputs
+            completed_at (float|datetime): Job completion time, defaults to now
+
+        Returns:
+            int: Number of segments indexed
+        """
+        completed_at = _to_epoch(completed_at)
+        rows = []
+        for segment_index, summary in enumerate(summaries):
+            if not summary:
+                continue
+            page_indices = summary.get('page_indices') or []
+            rows.append((
+                job_id,
+                segment_index,
+                summary.get('matched_blueprint_name'),
+                summary.get('document_class_type'),
+                summary.get('confidence'),
+                min(page_indices) if page_indices else None,
+                max(page_indices) if page_indices else None,
+                json.dumps(page_indices),
+                completed_at
+            ))
+        with self.conn:
+            self.conn.execute('DELETE FROM segments WHERE job_id = ?', (job_id,))
+            self.conn.executemany('INSERT INTO segments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            self.conn.execute('INSERT OR REPLACE INTO jobs VALUES (?, ?, ?)', (job_id, completed_at, len(rows)))
+        return len(rows)
+
+    def remove_job(self, job_id):
+        with self.conn:
+            self.conn.execute('DELETE FROM segments WHERE job_id = ?', (job_id,))
+            self.conn.execute('DELETE FROM jobs WHERE job_id = ?', (job_id,))
+
+    def query(self, blueprint=None, document_class=None, min_confidence=None, max_confidence=None,
+              since=None, until=None, limit=None):
+        """
+        Find indexed segments, e.g. all W-2 segments with confidence < 0.8 in the last week.
+
+        `max_confidence` is exclusive and `min_confidence` inclusive; `since`/`until`
+        filter on job completion time (epoch seconds or datetime).
+
+        Returns:
+            list: Segment dicts in the same shape as `get_summaries`, plus job_id and completed_at
+        """
+        clauses, params = [], []
+        if blueprint is not None:
+            clauses.append('matched_blueprint_name = ?')
+            params.append(blueprint)
+        if document_class is not None:
+            clauses.append('document_class_type = ?')
+            params.append(document_class)
+        if min_confidence is not None:
+            clauses.append('confidence >= ?')
+            params.append(min_confidence)
+        if max_confidence is not None:
+            clauses.append('confidence < ?')
+            params.append(max_confidence)
+        if since is not None:
+            clauses.append('completed_at >= ?')
+            params.append(_to_epoch(since))
+        if until is not None:
+            clauses.append('completed_at < ?')
+            params.append(_to_epoch(until))
+        sql = 'SELECT * FROM segments'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY completed_at DESC, job_id, segment_index'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        return [self._row_to_summary(row) for row in self.conn.execute(sql, params)]
+
+    def counts_by_blueprint(self, since=None):
+        sql = 'SELECT matched_blueprint_name, COUNT(*) AS segments, AVG(confidence) AS avg_confidence FROM segments'
+        params = []
+        if since is not None:
+            sql += ' WHERE completed_at >= ?'
+            params.append(_to_epoch(since))
+        sql += ' GROUP BY matched_blueprint_name ORDER BY segments DESC'
+        return [dict(row) for row in self.conn.execute(sql, params)]
+
+    @staticmethod
+    def _row_to_summary(row):
+        return {
+            'job_id': row['job_id'],
+            'segment_index': row['segment_index'],
+            'page_indices': json.loads(row['page_indices']) if row['page_indices'] else None,
+            'matched_blueprint_name': row['matched_blueprint_name'],
+            'confidence': row['confidence'],
+            'document_class_type': row['document_class_type'],
+            'completed_at': row['completed_at']
+        }
@@ -0,0 +1,190 @@
+import json
+from collections import defaultdict
+
+
+class PageSpatialIndex:
+    """
+    Uniform grid index over the bounding boxes of one page.
+
+    Boxes use BDA's normalized page coordinates `(left, top, width, height)` in [0, 1].
+    Each box is registered in every grid cell it touches, so point and region lookups
+    only test the handful of boxes in the cells they cover.
+    """
+
+    def __init__(self, grid_size=32):
+        self.grid_size = grid_size
+        self.entries = []
+        self.cells = defaultdict(list)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _cell_range(self, left, top, right, bottom):
+        last = self.grid_size - 1
+        x0 = min(max(int(left * self.grid_size), 0), last)
+        y0 = min(max(int(top * self.grid_size), 0), last)
+        x1 = min(max(int(right * self.grid_size), 0), last)
+        y1 = min(max(int(bottom * self.grid_size), 0), last)
+        return x0, y0, x1, y1
+
+    def insert(self, bbox, item):
+        left, top, width, height = bbox
+        entry_id = len(self.entries)
+        self.entries.append((left, top, left + width, top + height, item))
+        x0, y0, x1, y1 = self._cell_range(left, top, left + width, top + height)
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                self.cells[(cx, cy)].append(entry_id)
+        return entry_id
+
+    def _candidates(self, left, top, right, bottom):
+        x0, y0, x1, y1 = self._cell_range(left, top, right, bottom)
+        if x0 == x1 and y0 == y1:
+            return self.cells.get((x0, y0), ())
+        seen = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                seen.update(self.cells.get((cx, cy), ()))
+        return sorted(seen)
+
+    def query_point(self, x, y):
+        """Items whose box contains the normalized point (x, y)."""
+        return [self.entries[i][4] for i in self._candidates(x, y, x, y)
+                if self.entries[i][0] <= x <= self.entries[i][2] and self.entries[i][1] <= y <= self.entries[i][3]]
+
+    def query_region(self, left, top, width, height):
+        """Items whose box intersects the normalized region."""
+        right, bottom = left + width, top + height
+        return [self.entries[i][4] for i in self._candidates(left, top, right, bottom)
+                if self.entries[i][0] <= right and self.entries[i][2] >= left
+                and self.entries[i][1] <= bottom and self.entries[i][3] >= top]
+
+    def overlapping_pairs(self, min_iou=0.5):
+        """
+        Pairs of items whose boxes overlap with intersection-over-union >= `min_iou`,
+        e.g. the same value extracted into two fields or duplicated elements.
+        """
+        pairs = []
+        for i, (l1, t1, r1, b1, item1) in enumerate(self.entries):
+            for j in self._candidates(l1, t1, r1, b1):
+                if j <= i:
+                    continue
+                l2, t2, r2, b2, item2 = self.entries[j]
+                iw = min(r1, r2) - max(l1, l2)
+                ih = min(b1, b2) - max(t1, t2)
+                if iw <= 0 or ih <= 0:
+                    continue
+                intersection = iw * ih
+                union = (r1 - l1) * (b1 - t1) + (r2 - l2) * (b2 - t2) - intersection
+                iou = intersection / union if union > 0 else 0.0
+                if iou >= min_iou:
+                    pairs.append((item1, item2, iou))
+        return pairs
+
+
+class DocumentSpatialIndex:
+    """
+    Per-page spatial indexes built from custom output explainability geometry and
+    standard output element locations.
+
+    Example:
+        index = DocumentSpatialIndex.from_custom_output(custom_output)
+        index.add_standard_output(standard_output)
+        index.query_point(page=0, x=0.42, y=0.17)
+    """
+
+    def __init__(self, grid_size=32):
+        self.grid_size = grid_size
+        self.pages = {}
+
+    def page(self, page_index):
+        if page_index not in self.pages:
+            self.pages[page_index] = PageSpatialIndex(self.grid_size)
+        return self.pages[page_index]
+
+    def add(self, page_index, bbox, item):
+        self.page(page_index).insert(bbox, item)
+
+    def query_point(self, page, x, y):
+        return self.pages[page].query_point(x, y) if page in self.pages else []
+
+    def query_region(self, page, left, top, width, height):
+        return self.pages[page].query_region(left, top, width, height) if page in self.pages else []
+
+    def overlapping_pairs(self, min_iou=0.5):
+        return {page: index.overlapping_pairs(min_iou) for page, index in self.pages.items()}
+
+    @classmethod
+    def from_custom_output(cls, custom_output, grid_size=32):
+        index = cls(grid_size)
+        index.add_custom_output(custom_output)
+        return index
+
+    @classmethod
+    def from_standard_output(cls, standard_output, grid_size=32):
+        index = cls(grid_size)
+        index.add_standard_output(standard_output)
+        return index
+
+    def add_custom_output(self, custom_output):
+        """Index every field in `explainability_info` that carries geometry."""
+        explainability_info = custom_output.get('explainability_info', [])
+        if isinstance(explainability_info, dict):
+            explainability_info = [explainability_info]
+        for info in explainability_info:
+            for field, conf_info in iter_field_geometry(info):
+                for geometry in conf_info.get('geometry', []):
+                    self.add(geometry.get('page', 0), bbox_tuple(geometry['boundingBox']), {
+                        'kind': 'field',
+                        'id': field,
+                        'value': conf_info.get('value'),
+                        'confidence': conf_info.get('confidence'),
+                        'page': geometry.get('page', 0),
+                        'bbox': bbox_tuple(geometry['boundingBox'])
+                    })
+        return self
+
+    def add_standard_output(self, standard_output):
+        """Index every standard output element location."""
+        for element in standard_output.get('elements', []):
+            for location in element.get('locations', []):
+                bounding_box = location.get('bounding_box')
+                if not bounding_box:
+                    continue
+                page_index = location.get('page_index', 0)
+                self.add(page_index, bbox_tuple(bounding_box), {
+                    'kind': 'element',
+                    'id': element.get('id'),
+                    'type': element.get('type'),
+                    'sub_type': element.get('sub_type'),
+                    'page': page_index,
+                    'bbox': bbox_tuple(bounding_box)
+                })
+        return self
+
+
+def bbox_tuple(bounding_box):
+    return (bounding_box['left'], bounding_box['top'], bounding_box['width'], bounding_box['height'])
+
+
+def iter_field_geometry(info, prefix=''):
+    """Yield (field path, confidence info) for every explainability entry with geometry."""
+    if isinstance(info, list):
+        for i, item in enumerate(info):
+            yield from iter_field_geometry(item, f'{prefix}[{i}]')
+    elif isinstance(info, dict):
+        if 'geometry' in info or 'confidence' in info:
+            if info.get('geometry'):
+                yield prefix, info
+            return
+        for key, value in info.items():
+            yield from iter_field_geometry(value, f'{prefix}.{key}' if prefix else key)
+
+
+def bbox_attribute(geometry):
+    """JSON `data-bbox` value for the first geometry of a field, or None."""
+    if not geometry:
+        return None
+    first = geometry[0]
+    left, top, width, height = bbox_tuple(first['boundingBox'])
+    return json.dumps({'page': first.get('page', 0), 'left': left, 'top': top, 'width': width, 'height': height})
@@ -0,0 +1,143 @@
+import html
+
+import ipywidgets as widgets
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_PAGE_SIZE = 50
+
+
+class ColumnarTable:
+    """
+    A transformed custom output table (a list of row dicts whose cells are plain
+    values or `{'value', 'confidence'}` dicts) stored as one value array and one
+    confidence array per column.
+
+    Sorting works on the column arrays and rendering only touches the requested
+    page, so a bank statement with thousands of transactions costs the same to page
+    through as a short table.
+    """
+
+    def __init__(self, rows):
+        self.columns = list(dict.fromkeys(key for row in rows for key in row))
+        self.values = {}
+        self.confidences = {}
+        for column in self.columns:
+            cells = [row.get(column) for row in rows]
+            is_scored = [isinstance(cell, dict) and 'value' in cell for cell in cells]
+            values = np.empty(len(cells), dtype=object)
+            values[:] = [cell['value'] if scored else cell for cell, scored in zip(cells, is_scored)]
+            self.values[column] = values
+            if any(is_scored):
+                self.confidences[column] = np.array(
+                    [cell.get('confidence', np.nan) if scored else np.nan for cell, scored in zip(cells, is_scored)],
+                    dtype=np.float64)
+        self.row_count = len(rows)
+
+    def __len__(self):
+        return self.row_count
+
+    def sort_order(self, column=None, ascending=True):
+        """
+        Row order for sorting by `column`; numbers sort numerically, anything else as text.
+        The sort is stable in both directions and missing values always come last.
+        """
+        if column in self.values:
+            values = self.values[column]
+            missing = pd.isna(pd.Series(values)).to_numpy()
+            keys = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=np.float64)
+            if np.isnan(keys).sum() > np.count_nonzero(missing):
+                # Text: sort on the rank of each value among the distinct strings
+                _, keys = np.unique(np.array(['' if m else str(v) for v, m in zip(values, missing)]), return_inverse=True)
+                keys = keys.astype(np.float64)
+        elif column and column.endswith(' confidence') and column[:-len(' confidence')] in self.confidences:
+            keys = self.confidences[column[:-len(' confidence')]]
+            missing = np.isnan(keys)
+        else:
+            return np.arange(self.row_count)
+        keys = np.where(missing, 0.0, keys if ascending else -keys)
+        # lexsort is stable; its last key (missing) is the primary one
+        return np.lexsort((keys, missing))
+
+    def sort_columns(self):
+        """Column names that can be sorted on, including one confidence column per scored column."""
+        return self.columns + [f'{column} confidence' for column in self.columns if column in self.confidences]
+
+    def page_html(self, page=0, page_size=DEFAULT_PAGE_SIZE, order=None):
+        """
+        HTML table for one page of rows.
+
+        Args:
+            page (int): 0-based page number
+            page_size (int): Rows per page; None renders every row
+            order (np.ndarray): Row order from `sort_order`
+
+        Returns:
+            str: `<table class="table-view">` HTML
+        """
+        rows = order if order is not None else np.arange(self.row_count)
+        if page_size:
+            rows = rows[page * page_size:(page + 1) * page_size]
+
+        cell_columns = []
+        for column in self.columns:
+            escaped = np.array([html.escape(str(value)) for value in self.values[column][rows]], dtype=object)
+            if column in self.confidences:
+                confidence = self.confidences[column][rows]
+                labels = np.char.mod("<span class='confidence'>(%.1f%%)</span>", np.nan_to_num(confidence) * 100)
+                escaped = escaped + np.where(np.isnan(confidence), '', labels).astype(object)
+            cell_columns.append(escaped)
+
+        header = ''.join(f'<th>{html.escape(str(column))}</th>' for column in self.columns)
+        body = ''.join(f"<tr><td>{'</td><td>'.join(cells)}</td></tr>" for cells in zip(*cell_columns))
+        return f'<table class="table-view"><thead><tr>{header}</tr></thead><tbody>{body}</tbody></table>'
+
+
+class PagedTableView(widgets.VBox):
+    """
+    Table widget that renders one page of a `ColumnarTable` at a time, with paging
+    and sorting handled in the kernel.
+    """
+
+    def __init__(self, table, title=None, page_size=DEFAULT_PAGE_SIZE, **kwargs):
+        self.table = table
+        self.page_size = page_size
+        self.page = 0
+        self.order = None
+
+        self.sort_by = widgets.Dropdown(options=[('(original order)', None)] + [(c, c) for c in table.sort_columns()],
+                                        description='Sort by', layout=widgets.Layout(width='260px'))
+        self.ascending = widgets.ToggleButton(value=True, description='Ascending', layout=widgets.Layout(width='100px'))
+        self.previous_button = widgets.Button(description='◀', layout=widgets.Layout(width='40px'))
+        self.next_button = widgets.Button(description='▶', layout=widgets.Layout(width='40px'))
+        self.status = widgets.Label()
+        self.content = widgets.HTML()
+
+        self.sort_by.observe(self._on_sort, names='value')
+        self.ascending.observe(self._on_sort, names='value')
+        self.previous_button.on_click(lambda _: self.show_page(self.page - 1))
+        self.next_button.on_click(lambda _: self.show_page(self.page + 1))
+
+        header = [widgets.HTML(f'<h3>{html.escape(str(title))}</h3>')] if title else []
+        controls = widgets.HBox([self.sort_by, self.ascending, self.previous_button, self.next_button, self.status])
+        super().__init__(header + [controls, self.content], **kwargs)
+        self.show_page(0)
+
+    @property
+    def page_count(self):
+        return max(1, -(-len(self.table) // self.page_size))
+
+    def _on_sort(self, _):
+        self.ascending.description = 'Ascending' if self.ascending.value else 'Descending'
+        self.order = self.table.sort_order(self.sort_by.value, self.ascending.value) if self.sort_by.value else None
+        self.show_page(0)
+
+    def show_page(self, page):
+        self.page = min(max(page, 0), self.page_count - 1)
+        self.content.value = f'<div class="table-wrapper">{self.table.page_html(self.page, self.page_size, self.order)}</div>'
+        first = self.page * self.page_size
+        last = min(first + self.page_size, len(self.table))
+        self.status.value = f'rows {first + 1 if len(self.table) else 0}-{last} of {len(self.table)}'
+        self.previous_button.disabled = self.page == 0
+        self.next_button.disabled = self.page >= self.page_count - 1
@@ -1,60 +1,130 @@
 import json
 import ipywidgets as widgets
-import io
+import itertools
+import html
+from .image_encoding import DEFAULT_QUALITY, encode_image
 
 
-def pil_to_bytes(image):
-    byte_arr = io.BytesIO()
-    image.save(byte_arr, format='PNG')
-    return byte_arr.getvalue()
+def pil_to_bytes(image, format='PNG', quality=DEFAULT_QUALITY, max_width=None):
+    return encode_image(image, format=format, quality=quality, max_width=max_width)[0]
 
 
 def display_image(image):
-    image_widget = widgets.Image(value=pil_to_bytes(image), format='png')
+    # Shown at 400px, so encode a 2x JPEG instead of a full-size PNG
+    image_widget = widgets.Image(value=pil_to_bytes(image, format='JPEG', max_width=800), format='jpeg')
     image_widget.layout.width = '400px'
     image_widget.layout.height = 'auto'
     image_widget.layout.object_fit = 'contain'
     return image_widget
 
-def json_to_html(json_obj, indent=0):
-    result = []
-    if isinstance(json_obj, dict):
-        result.append('<table class="json-object">')
-        for key, value in json_obj.items():
-            result.append('<tr>')
-            result.append(f'<td class="key">{key}</td>')
-            result.append('<td class="value">')
-            result.append(json_to_html(value, indent + 1))
-            result.append('</td>')
-            result.append('</tr>')
-        result.append('</table>')
-    elif isinstance(json_obj, list):
-        result.append('<table class="json-array">')
-        for i, item in enumerate(json_obj):
-            result.append('<tr>')
-            result.append(f'<td class="key">{i}</td>')
-            result.append('<td class="value">')
-            result.append(json_to_html(item, indent + 1))
-            result.append('</td>')
-            result.append('</tr>')
-        result.append('</table>')
-    elif isinstance(json_obj, (str, int, float, bool)) or json_obj is None:
-        if isinstance(json_obj, str):
-            result.append(f'<span class="string">"{json_obj}"</span>')
-        elif isinstance(json_obj, bool):
-            result.append(f'<span class="boolean">{str(json_obj).lower()}</span>')
-        elif json_obj is None:
-            result.append('<span class="null">null</span>')
+JSON_HTML_MAX_NODES = 2000
+JSON_HTML_MAX_DEPTH = 8
+
+
+def _json_path_str(path):
+    return '$' + ''.join(f'[{p}]' if isinstance(p, int) else f'.{p}' for p in path)
+
+
+def _json_placeholder(path, start, label):
+    return (f'<span class="collapsed" data-path="{html.escape(_json_path_str(path))}" data-start="{start}">'
+            f'{html.escape(label)}</span>')
+
+
+def _json_scalar_html(value):
+    if isinstance(value, str):
+        return f'<span class="string">"{html.escape(value)}"</span>'
+    if isinstance(value, bool):
+        return f'<span class="boolean">{str(value).lower()}</span>'
+    if value is None:
+        return '<span class="null">null</span>'
+    return f'<span class="number">{html.escape(str(value))}</span>'
+
+
+def render_json_html(json_obj, max_nodes=JSON_HTML_MAX_NODES, max_depth=JSON_HTML_MAX_DEPTH, path=(), start=0):
+    """
+    Render JSON as nested HTML tables without recursion, into a single buffer.
+
+    Keys and values are escaped. At most `max_nodes` entries and `max_depth` levels
+    are rendered; anything beyond is emitted as a collapsed placeholder and reported
+    so it can be expanded on demand with `expand_json_html`.
+
+    Returns:
+        tuple: (html, collapsed) where collapsed is a list of (path, start) pairs
+    """
+    if not isinstance(json_obj, (dict, list)):
+        return _json_scalar_html(json_obj), []
+
+    out = []
+    collapsed = []
+    budget = max_nodes
+
+    def open_container(value, node_path, offset):
+        if isinstance(value, dict):
+            out.append('<table class="json-object">')
+            entries = itertools.islice(value.items(), offset, None)
         else:
-            result.append(f'<span class="number">{json_obj}</span>')
-    return ''.join(result)
-    
-def display_json(json_data, title):
+            out.append('<table class="json-array">')
+            entries = enumerate(itertools.islice(value, offset, None), offset)
+        # Frame: [entry iterator, path, size, next position]
+        return [entries, tuple(node_path), len(value), offset]
+
+    stack = [open_container(json_obj, path, start)]
+    while stack:
+        frame = stack[-1]
+        entry = next(frame[0], None) if budget > 0 else None
+        if entry is None:
+            _, node_path, size, position = frame
+            if position < size:
+                collapsed.append((node_path, position))
+                out.append('<tr><td class="key"></td><td class="value">')
+                out.append(_json_placeholder(node_path, position, f'… {size - position} more'))
+                out.append('</td></tr>')
+            out.append('</table>')
+            stack.pop()
+            if stack:
+                out.append('</td></tr>')
+            continue
+
+        key, child = entry
+        frame[3] += 1
+        budget -= 1
+        out.append(f'<tr><td class="key">{html.escape(str(key))}</td><td class="value">')
+        if not isinstance(child, (dict, list)):
+            out.append(_json_scalar_html(child))
+            out.append('</td></tr>')
+        elif child and len(stack) >= max_depth:
+            child_path = frame[1] + (key,)
+            label = f'{{…}} {len(child)} keys' if isinstance(child, dict) else f'[…] {len(child)} items'
+            collapsed.append((child_path, 0))
+            out.append(_json_placeholder(child_path, 0, label))
+            out.append('</td></tr>')
+        else:
+            stack.append(open_container(child, frame[1] + (key,), 0))
+    return ''.join(out), collapsed
+
+
+def get_json_path(json_obj, path):
+    for key in path:
+        json_obj = json_obj[key]
+    return json_obj
+
+
+def expand_json_html(json_obj, path, start=0, max_nodes=JSON_HTML_MAX_NODES, max_depth=JSON_HTML_MAX_DEPTH):
+    """Render a collapsed placeholder reported by `render_json_html`."""
+    return render_json_html(get_json_path(json_obj, path), max_nodes=max_nodes, max_depth=max_depth,
+                            path=path, start=start)
+
+
+def json_to_html(json_obj, indent=0, max_nodes=JSON_HTML_MAX_NODES, max_depth=JSON_HTML_MAX_DEPTH):
+    return render_json_html(json_obj, max_nodes=max_nodes, max_depth=max_depth)[0]
+
+def display_json(json_data, title, max_nodes=JSON_HTML_MAX_NODES, max_depth=JSON_HTML_MAX_DEPTH):
+    json_html, collapsed = render_json_html(json_data, max_nodes=max_nodes, max_depth=max_depth)
     html_content = f"""
     <div class="json-container">
-        <h3 class="json-title">{title}</h3>
+        <h3 class="json-title">{html.escape(str(title))}</h3>
         <div class="json-viewer">
-            {json_to_html(json_data)}
+            {json_html}
         </div>
     </div>
     <style>
@@ -95,9 +165,32 @@ def display_json(json_data, title):
         .number {{ color: #116644; }}
         .boolean {{ color: #ff8c00; }}
         .null {{ color: #808080; }}
+        .collapsed {{ color: #808080; font-style: italic; }}
     </style>
     """
-    return widgets.HTML(html_content)
+    if not collapsed:
+        return widgets.HTML(html_content)
+
+    # Collapsed nodes are rendered only when the user asks for them
+    def option(path, start):
+        return (f'{_json_path_str(path)}' + (f' (from {start})' if start else ''), (path, start))
+
+    selector = widgets.Dropdown(options=[option(*c) for c in collapsed], description='Collapsed:')
+    expand_button = widgets.Button(description='Expand')
+    expanded = widgets.VBox([])
+
+    def on_expand(_):
+        if selector.value is None:
+            return
+        path, start = selector.value
+        sub_html, sub_collapsed = expand_json_html(json_data, path, start, max_nodes=max_nodes, max_depth=max_depth)
+        expanded.children = (*expanded.children, widgets.HTML(
+            f'<div class="json-viewer"><b>{html.escape(_json_path_str(path))}</b>{sub_html}</div>'))
+        remaining = [o for o in selector.options if o[1] != (path, start)]
+        selector.options = remaining + [option(*c) for c in sub_collapsed]
+
+    expand_button.on_click(on_expand)
+    return widgets.VBox([widgets.HTML(html_content), widgets.HBox([selector, expand_button]), expanded])
 
 def display_image_jsons(image, json_arr, titles):
     image_widget = display_image(image)
@@ -119,4 +212,12 @@ def get_s3_to_dict(s3, s3_url):
     
     # Parse the JSON content
     json_obj = json.loads(json_content)
-    return json_obj
\ No newline at end of file
+    return json_obj
+
+def get_summaries(custom_outputs):
+    return [{
+        'page_indices': output.get('split_document', {}).get('page_indices'),
+        'matched_blueprint_name': output.get('matched_blueprint', {}).get('name'),
+        'confidence': output.get('matched_blueprint', {}).get('confidence'),
+        'document_class_type': output.get('document_class', {}).get('type')
+    } if output else {} for output in custom_outputs]
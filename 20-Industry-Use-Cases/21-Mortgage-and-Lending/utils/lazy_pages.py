@@ -0,0 +1,146 @@
+import os
+from collections import OrderedDict
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import pypdfium2 as pdfium
+from PIL import Image
+
+
+# Documents opened by each worker process, so a worker opens a package only once
+_worker_documents = {}
+
+
+def _render_to_shared_memory(pdf_path, page_index, scale):
+    """
+    Worker: render one page and hand the pixels back through shared memory
+    instead of pickling a PIL image. Returns (shm name, mode, size).
+    """
+    pdf = _worker_documents.get(pdf_path)
+    if pdf is None:
+        pdf = _worker_documents[pdf_path] = pdfium.PdfDocument(pdf_path)
+    page = pdf[page_index]
+    image = page.render(scale=scale).to_pil()
+    page.close()
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    pixels = image.tobytes()
+    shm = shared_memory.SharedMemory(create=True, size=len(pixels))
+    shm.buf[:len(pixels)] = pixels
+    name = shm.name
+    shm.close()
+    # The parent unlinks the segment; without this the worker's tracker would
+    # report it as leaked and try to unlink it again
+    resource_tracker.unregister(shm._name, 'shared_memory')
+    return name, image.mode, image.size
+
+
+def _image_from_shared_memory(name, mode, size):
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        nbytes = size[0] * size[1] * len(mode)
+        buffer = shm.buf[:nbytes]
+        # Read the pixels in place and copy them once; the view is released before close
+        image = Image.frombuffer(mode, size, buffer, 'raw', mode, 0, 1).copy()
+        buffer.release()
+        return image
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _image_nbytes(image):
+    return image.width * image.height * len(image.getbands())
+
+
+class LazyPages(Sequence):
+    """
+    Lazy sequence of rendered PDF pages.
+
+    Pages are rendered when first indexed, and the next `lookahead` pages are
+    rendered ahead of time in a process pool. Rendered pages are kept until the
+    `memory_budget_mb` is exceeded, then the least recently used pages are evicted
+    (and re-rendered if needed again).
+
+    Example:
+        pages_pil = LazyPages(file_name, scale=1.53)
+        pages_pil[3]
+    """
+
+    def __init__(self, pdf_path, scale=1.53, workers=None, lookahead=2, memory_budget_mb=512):
+        self.pdf_path = os.path.abspath(pdf_path)
+        self.scale = scale
+        self.lookahead = lookahead
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        pdf = pdfium.PdfDocument(self.pdf_path)
+        self.page_count = len(pdf)
+        pdf.close()
+        self.workers = workers if workers is not None else min(os.cpu_count() or 1, self.page_count)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        self.pending = {}
+        self.rendered = OrderedDict()
+        self.rendered_bytes = 0
+
+    def __len__(self):
+        return self.page_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.page_count))]
+        if index < 0:
+            index += self.page_count
+        if not 0 <= index < self.page_count:
+            raise IndexError('page index out of range')
+
+        if index in self.rendered:
+            self.rendered.move_to_end(index)
+            image = self.rendered[index]
+        elif index in self.pending or self.executor:
+            self.prefetch([index])
+            image = self._store(index, _image_from_shared_memory(*self.pending.pop(index).result()))
+        else:
+            pdf = pdfium.PdfDocument(self.pdf_path)
+            try:
+                image = self._store(index, pdf[index].render(scale=self.scale).to_pil())
+            finally:
+                pdf.close()
+
+        self.prefetch(range(index + 1, min(index + 1 + self.lookahead, self.page_count)))
+        return image
+
+    def prefetch(self, indices):
+        """Start rendering pages in the background."""
+        if not self.executor:
+            return
+        for index in indices:
+            if index not in self.rendered and index not in self.pending:
+                self.pending[index] = self.executor.submit(
+                    _render_to_shared_memory, self.pdf_path, index, self.scale)
+
+    def _store(self, index, image):
+        self.rendered[index] = image
+        self.rendered_bytes += _image_nbytes(image)
+        while self.rendered_bytes > self.memory_budget and len(self.rendered) > 1:
+            _, evicted = self.rendered.popitem(last=False)
+            self.rendered_bytes -= _image_nbytes(evicted)
+        return image
+
+    def close(self):
+        if self.executor:
+            for index, future in self.pending.items():
+                if future.cancel():
+                    continue
+                try:
+                    _image_from_shared_memory(*future.result())
+                except Exception:
+                    pass
+            self.pending.clear()
+            self.executor.shutdown()
+            self.executor = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
@@ -0,0 +1,290 @@
+import copy
+import json
+import os
+import time
+import uuid
+
+import numpy as np
+import pypdfium2 as pdfium
+
+
+def _document(granularity, text_formats, bounding_box=False, generative_field=False):
+    return {
+        'extraction': {
+            'granularity': {'types': list(granularity)},
+            'boundingBox': {'state': 'ENABLED' if bounding_box else 'DISABLED'}
+        },
+        'generativeField': {'state': 'ENABLED' if generative_field else 'DISABLED'},
+        'outputFormat': {
+            'textFormat': {'types': list(text_formats)},
+            'additionalFileFormat': {'state': 'DISABLED'}
+        }
+    }
+
+
+# Image, video and audio settings for projects that only process documents
+_MEDIA_DISABLED = {
+    'image': {
+        'extraction': {'category': {'state': 'DISABLED'}, 'boundingBox': {'state': 'DISABLED'}},
+        'generativeField': {'state': 'DISABLED'}
+    },
+    'video': {
+        'extraction': {'category': {'state': 'DISABLED'}, 'boundingBox': {'state': 'DISABLED'}},
+        'generativeField': {'state': 'DISABLED'}
+    },
+    'audio': {
+        'extraction': {'category': {'state': 'DISABLED'}},
+        'generativeField': {'state': 'DISABLED'}
+    }
+}
+
+# Named standardOutputConfiguration profiles:
+#   custom-only     the pipeline reads only the blueprint (custom) output
+#   markdown-pages  custom output plus one markdown representation per page
+#   full            every granularity, text format and generative field
+OUTPUT_PROFILES = {
+    'custom-only': {'document': _document(['DOCUMENT'], ['PLAIN_TEXT']), **_MEDIA_DISABLED},
+    'markdown-pages': {'document': _document(['PAGE'], ['MARKDOWN']), **_MEDIA_DISABLED},
+    'full': {
+        'document': _document(['PAGE', 'ELEMENT'], ['PLAIN_TEXT', 'MARKDOWN', 'HTML', 'CSV'],
+                              bounding_box=True, generative_field=True),
+        'image': {
+            'extraction': {
+                'category': {'state': 'ENABLED', 'types': ['TEXT_DETECTION']},
+                'boundingBox': {'state': 'ENABLED'}
+            },
+            'generativeField': {'state': 'ENABLED', 'types': ['IMAGE_SUMMARY']}
+        },
+        'video': {
+            'extraction': {
+                'category': {'state': 'ENABLED', 'types': ['TEXT_DETECTION']},
+                'boundingBox': {'state': 'ENABLED'}
+            },
+            'generativeField': {'state': 'ENABLED', 'types': ['VIDEO_SUMMARY', 'CHAPTER_SUMMARY']}
+        },
+        'audio': {
+            'extraction': {'category': {'state': 'ENABLED', 'types': ['TRANSCRIPT']}},
+            'generativeField': {'state': 'ENABLED', 'types': ['IAB']}
+        }
+    }
+}
+
+
+def standard_output_configuration(profile):
+    """
+    `standardOutputConfiguration` for a named profile.
+
+    Args:
+        profile (str): 'custom-only', 'markdown-pages' or 'full'
+
+    Returns:
+        dict: A copy that can be modified before creating the project
+    """
+    if profile not in OUTPUT_PROFILES:
+        raise ValueError(f"Unknown output profile '{profile}', expected one of {', '.join(OUTPUT_PROFILES)}")
+    return copy.deepcopy(OUTPUT_PROFILES[profile])
+
+
+def _page_lines(page, scale=0.5, ink_level=160, min_ink_ratio=0.002):
+    """
+    (text, bounding box) per text line of a page. Uses the text layer when there is
+    one; scanned pages get one synthetic line per band of ink, with a word count
+    proportional to the band width, so the output volume follows the page content.
+    """
+    width, height = page.get_size()
+    textpage = page.get_textpage()
+    try:
+        lines = []
+        for i in range(textpage.count_rects()):
+            left, bottom, right, top = textpage.get_rect(i)
+            text = textpage.get_text_bounded(left, bottom, right, top).strip()
+            if text:
+                lines.append((text, {'left': left / width, 'top': 1 - top / height,
+                                     'width': (right - left) / width, 'height': (top - bottom) / height}))
+        if lines:
+            return lines
+    finally:
+        textpage.close()
+
+    pixels = np.asarray(page.render(scale=scale, grayscale=True).to_pil().convert('L')) < ink_level
+    rows = pixels.mean(axis=1) > min_ink_ratio
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], rows.astype(np.int8), [0]))))
+    for top, bottom in zip(edges[::2], edges[1::2]):
+        columns = np.flatnonzero(pixels[top:bottom].any(axis=0))
+        words = max(1, int(columns[-1] - columns[0]) // 24)
+        lines.append((' '.join(['lorem'] * words), {
+            'left': columns[0] / pixels.shape[1], 'top': top / pixels.shape[0],
+            'width': (columns[-1] - columns[0] + 1) / pixels.shape[1], 'height': (bottom - top) / pixels.shape[0]}))
+    return lines
+
+
+def _representation(lines, text_formats):
+    text = '\n'.join(line for line, _ in lines)
+    representation = {}
+    if 'PLAIN_TEXT' in text_formats:
+        representation['text'] = text
+    if 'MARKDOWN' in text_formats:
+        representation['markdown'] = '\n\n'.join(line for line, _ in lines)
+    if 'HTML' in text_formats:
+        representation['html'] = ''.join(f'<p>{line}</p>' for line, _ in lines)
+    return representation
+
+
+class LocalBdaStandIn:
+    """
+    Writes BDA-shaped results for a document to a local directory, so output
+    profiles can be compared without running jobs.
+
+    The standard output follows the layout of the BDA document output (document,
+    pages and elements sections, requested text formats, bounding boxes and
+    generative fields only when enabled). The custom output is a fixed blueprint
+    result, the same under every profile.
+
+    Example:
+        stand_in = LocalBdaStandIn('bda_stand_in')
+        metadata_path = stand_in.invoke('documents/lending_package.pdf', standard_output_configuration('full'))
+    """
+
+    def __init__(self, output_dir, lines_per_element=4):
+        self.output_dir = output_dir
+        self.lines_per_element = lines_per_element
+
+    def standard_output(self, pdf_path, config):
+        document_config = config['document']
+        granularity = document_config['extraction']['granularity']['types']
+        text_formats = document_config['outputFormat']['textFormat']['types']
+        bounding_box = document_config['extraction']['boundingBox']['state'] == 'ENABLED'
+        generative_field = document_config['generativeField']['state'] == 'ENABLED'
+
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            pages = []
+            for i in range(len(pdf)):
+                page = pdf[i]
+                pages.append(_page_lines(page))
+                page.close()
+        finally:
+            pdf.close()
+
+        all_lines = [line for lines in pages for line in lines]
+        statistics = {'element_count': 0, 'table_count': 0, 'figure_count': 0,
+                      'word_count': sum(len(text.split()) for text, _ in all_lines), 'line_count': len(all_lines)}
+        output = {
+            'metadata': {'semantic_modality': 'DOCUMENT', 'number_of_pages': len(pages),
+                         'start_page_index': 0, 'end_page_index': len(pages) - 1},
+            'document': {'statistics': statistics}
+        }
+        if 'DOCUMENT' in granularity:
+            output['document']['representation'] = _representation(all_lines, text_formats)
+        if generative_field:
+            words = ' '.join(text for text, _ in all_lines).split()
+            output['document']['description'] = ' '.join(words[:40])
+            output['document']['summary'] = ' '.join(words[:120])
+        if 'PAGE' in granularity:
+            output['pages'] = [{
+                'page_index': i,
+                'representation': _representation(lines, text_formats),
+                'statistics': {'line_count': len(lines), 'word_count': sum(len(text.split()) for text, _ in lines)}
+            } for i, lines in enumerate(pages)]
+        if 'ELEMENT' in granularity:
+            elements = []
+            for i, lines in enumerate(pages):
+                for start in range(0, len(lines), self.lines_per_element):
+                    chunk = lines[start:start + self.lines_per_element]
+                    element = {
+                        'id': str(uuid.uuid4()),
+                        'type': 'TEXT',
+                        'sub_type': 'PARAGRAPH',
+                        'reading_order': len(elements),
+                        'page_indices': [i],
+                        'representation': _representation(chunk, text_formats)
+                    }
+                    if bounding_box:
+                        element['locations'] = [{'page_index': i, 'bounding_box': box} for _, box in chunk]
+                    elements.append(element)
+            output['elements'] = elements
+            statistics['element_count'] = len(elements)
+        return output
+
+    def invoke(self, pdf_path, standard_output_configuration):
+        """Write job metadata, standard and custom output; returns the job metadata path."""
+        job_dir = os.path.join(self.output_dir, uuid.uuid4().hex)
+        os.makedirs(job_dir, exist_ok=True)
+        standard_output = self.standard_output(pdf_path, standard_output_configuration)
+        outputs = {
+            'standard_output_path': standard_output,
+            'custom_output_path': {
+                'matched_blueprint': {'name': 'stand-in', 'confidence': 1},
+                'split_document': {'page_indices': list(range(standard_output['metadata']['number_of_pages']))},
+                'inference_result': {}
+            }
+        }
+        segment = {}
+        for key, value in outputs.items():
+            path = os.path.join(job_dir, f"{key.split('_')[0]}_output.json")
+            with open(path, 'w') as f:
+                json.dump(value, f)
+            segment[key] = path
+        metadata_path = os.path.join(job_dir, 'job_metadata.json')
+        with open(metadata_path, 'w') as f:
+            json.dump({'output_metadata': [{'asset_id': 0, 'segment_metadata': [segment]}]}, f)
+        return metadata_path
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def benchmark_profiles(document_paths, output_dir='bda_stand_in', profiles=None, read=_read_file, repeats=3):
+    """
+    Run the same documents through each output profile with `LocalBdaStandIn` and
+    measure what a consumer pays to fetch and parse the results, the way the
+    notebook reads them (job metadata, then standard and custom output per segment).
+
+    Args:
+        document_paths (list): PDF files
+        output_dir (str): Directory for the stand-in results
+        profiles (list): Profile names; defaults to all of `OUTPUT_PROFILES`
+        read (callable): Path -> bytes, e.g. an S3 reader; defaults to local files
+        repeats (int): Fetch/parse repetitions; the fastest is reported
+
+    Returns:
+        list: Per profile standard and total output bytes and fetch/parse milliseconds
+    """
+    results = []
+    for profile in profiles or list(OUTPUT_PROFILES):
+        stand_in = LocalBdaStandIn(os.path.join(output_dir, profile))
+        config = standard_output_configuration(profile)
+        metadata_paths = [stand_in.invoke(path, config) for path in document_paths]
+
+        best = None
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            standard_bytes = total_bytes = 0
+            for metadata_path in metadata_paths:
+                data = read(metadata_path)
+                total_bytes += len(data)
+                for segment in json.loads(data)['output_metadata'][0]['segment_metadata']:
+                    standard = read(segment['standard_output_path'])
+                    custom = read(segment['custom_output_path'])
+                    json.loads(standard)
+                    json.loads(custom)
+                    standard_bytes += len(standard)
+                    total_bytes += len(standard) + len(custom)
+            elapsed = time.perf_counter() - start_time
+            best = elapsed if best is None else min(best, elapsed)
+
+        results.append({
+            'profile': profile,
+            'documents': len(metadata_paths),
+            'standard_output_bytes': standard_bytes,
+            'total_output_bytes': total_bytes,
+            'fetch_parse_ms': round(best * 1000, 2)
+        })
+
+    print(f"{'profile':<16}{'standard bytes':>16}{'total bytes':>14}{'fetch+parse ms':>16}")
+    for result in results:
+        print(f"{result['profile']:<16}{result['standard_output_bytes']:>16,}"
+              f"{result['total_output_bytes']:>14,}{result['fetch_parse_ms']:>16}")
+    return results
@@ -0,0 +1,164 @@
+import hashlib
+import os
+
+import numpy as np
+import pypdfium2 as pdfium
+from PIL import Image
+
+
+# Thumbnail size: 9x8 blocks of 16x16 pixels, which is what the difference hash needs
+THUMBNAIL_SIZE = (144, 128)
+HASH_GRID = (8, 9)
+
+# A page is blank when almost no pixels carry ink and the page is nearly uniform
+INK_LEVEL = 160
+MAX_INK_RATIO = 0.002
+MAX_BLANK_STD = 6.0
+
+# Near-duplicates (re-encoded or re-exported copies) need both a close hash and
+# every 4x4 block of the thumbnails within a few grey levels, so same-template
+# forms with different values are kept
+HASH_MARGIN = 2.0
+MAX_HASH_DISTANCE = 2
+POOL_SIZE = 4
+MAX_BLOCK_DIFFERENCE = 12.0
+
+
+def rasterize_thumbnails(pdf_path, size=THUMBNAIL_SIZE):
+    """
+    Render every page as a small grayscale thumbnail.
+
+    Returns:
+        np.ndarray: (pages, height, width) uint8 array
+    """
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        thumbnails = np.empty((len(pdf), size[1], size[0]), dtype=np.uint8)
+        for i in range(len(pdf)):
+            page = pdf[i]
+            image = page.render(scale=size[0] / page.get_width(), grayscale=True).to_pil()
+            page.close()
+            thumbnails[i] = np.asarray(image.convert('L').resize(size, Image.BOX))
+        return thumbnails
+    finally:
+        pdf.close()
+
+
+def blank_mask(thumbnails, ink_level=INK_LEVEL, max_ink_ratio=MAX_INK_RATIO, max_std=MAX_BLANK_STD):
+    """Boolean mask of blank pages, from the share of dark pixels and the pixel spread."""
+    pixels = thumbnails.reshape(len(thumbnails), -1).astype(np.float32)
+    ink_ratio = (pixels < ink_level).mean(axis=1)
+    return (ink_ratio <= max_ink_ratio) & (pixels.std(axis=1) <= max_std)
+
+
+def _pool(thumbnails, rows, cols):
+    count, height, width = thumbnails.shape
+    return thumbnails.reshape(count, rows, height // rows, cols, width // cols).mean(axis=(2, 4))
+
+
+def difference_hashes(thumbnails, margin=HASH_MARGIN):
+    """
+    64-bit difference hash per page as an (pages, 64) boolean array. A bit is set
+    only when a block is brighter than its left neighbour by `margin`, so noise in
+    flat areas does not flip bits.
+    """
+    blocks = _pool(thumbnails, *HASH_GRID)
+    return (blocks[:, :, 1:] > blocks[:, :, :-1] + margin).reshape(len(thumbnails), -1)
+
+
+def duplicate_of(thumbnails, candidates, max_hash_distance=MAX_HASH_DISTANCE, max_block_difference=MAX_BLOCK_DIFFERENCE):
+    """
+    For each page, the earlier page it duplicates, or -1.
+
+    Exact duplicates have identical thumbnails; near-duplicates are within
+    `max_hash_distance` bits of hash distance and no 4x4 block differs by more
+    than `max_block_difference` grey levels. Only pages in `candidates` are compared.
+    """
+    duplicates = np.full(len(thumbnails), -1, dtype=np.int64)
+    indices = np.flatnonzero(candidates)
+    if len(indices) < 2:
+        return duplicates
+
+    digests = {}
+    hashes = difference_hashes(thumbnails[indices])
+    height, width = thumbnails.shape[1:]
+    pooled = _pool(thumbnails[indices], height // POOL_SIZE, width // POOL_SIZE)
+    distances = (hashes[:, None, :] != hashes[None, :, :]).sum(axis=2)
+    for position, page in enumerate(indices):
+        digest = hashlib.sha1(thumbnails[page].tobytes()).digest()
+        if digest in digests:
+            duplicates[page] = digests[digest]
+            continue
+        digests[digest] = page
+        # Earlier pages with a close hash that were not themselves dropped as duplicates
+        for earlier in np.flatnonzero(distances[position, :position] <= max_hash_distance):
+            original = indices[earlier]
+            if duplicates[original] != -1:
+                continue
+            if np.abs(pooled[position] - pooled[earlier]).max() <= max_block_difference:
+                duplicates[page] = original
+                break
+    return duplicates
+
+
+def filter_pages(pdf_path, output_path=None, remove_blank=True, remove_duplicates=True):
+    """
+    Drop blank and duplicate pages from a PDF before sending it to BDA.
+
+    Args:
+        pdf_path (str): Input PDF
+        output_path (str): Cleaned PDF; defaults to `<name>_filtered.pdf`. Nothing is
+            written, and `output_path` is the input, when no page is removed. The
+            first page is kept when every page would be removed
+        remove_blank (bool): Drop blank pages
+        remove_duplicates (bool): Drop exact and near-duplicate pages
+
+    Returns:
+        dict: `output_path`, `page_map` (cleaned page index -> original page index),
+        `removed` (original page index -> reason) and `summary`
+    """
+    thumbnails = rasterize_thumbnails(pdf_path)
+    page_count = len(thumbnails)
+    blank = blank_mask(thumbnails) if remove_blank else np.zeros(page_count, dtype=bool)
+    duplicates = duplicate_of(thumbnails, ~blank) if remove_duplicates else np.full(page_count, -1)
+
+    removed = {}
+    for page in np.flatnonzero(blank):
+        removed[int(page)] = 'blank'
+    for page in np.flatnonzero(duplicates >= 0):
+        removed[int(page)] = f'duplicate of page {int(duplicates[page])}'
+    if page_count == 0:
+        raise ValueError(f'{pdf_path} has no pages')
+    if len(removed) == page_count:
+        # Never produce an empty PDF: keep the first page, even if it looks blank
+        del removed[0]
+    kept = [page for page in range(page_count) if page not in removed]
+
+    if removed:
+        output_path = output_path or f'{os.path.splitext(pdf_path)[0]}_filtered.pdf'
+        source = pdfium.PdfDocument(pdf_path)
+        cleaned = pdfium.PdfDocument.new()
+        try:
+            cleaned.import_pages(source, kept)
+            cleaned.save(output_path)
+        finally:
+            cleaned.close()
+            source.close()
+    else:
+        output_path = pdf_path
+
+    summary = f'{page_count} pages -> {len(kept)} pages ({len(removed)} removed)'
+    print(summary)
+    for page, reason in sorted(removed.items()):
+        print(f'  page {page}: {reason}')
+    return {
+        'output_path': output_path,
+        'page_map': dict(enumerate(kept)),
+        'removed': removed,
+        'summary': summary
+    }
+
+
+def original_page_indices(page_indices, page_map):
+    """Map BDA `page_indices` of the cleaned PDF back to the original page numbers."""
+    return [page_map[index] for index in page_indices]
@@ -0,0 +1,343 @@
+import hashlib
+import io
+import itertools
+import json
+import math
+import re
+import time
+from collections import Counter
+
+import numpy as np
+import pypdfium2 as pdfium
+from PIL import Image
+
+
+# Pages are rendered this wide (grayscale) for the layout features
+RENDER_WIDTH = 96
+INK_LEVEL = 160
+LAYOUT_GRID = (6, 6)
+TOKEN_PATTERN = re.compile(r'[a-z][a-z0-9\-]{2,}')
+
+KEYWORDS_PER_CLASS = 20
+# A keyword must be on this many more of the class pages than of the other pages
+MIN_KEYWORD_LIFT = 0.3
+KEYWORD_WEIGHT = 2.0
+
+# Per page, candidates are added until they cover this probability
+COVERAGE = 0.95
+MAX_BLUEPRINTS = 3
+
+
+def _layout_features(pixels, width, height):
+    ink = pixels < INK_LEVEL
+    rows, cols = LAYOUT_GRID
+    h, w = ink.shape[0] // rows * rows, ink.shape[1] // cols * cols
+    grid = ink[:h, :w].reshape(rows, h // rows, cols, w // cols).mean(axis=(1, 3)).ravel()
+    row_ink = ink.mean(axis=1)
+    # Text lines and ruled lines, relative to the page height
+    lines = np.count_nonzero(np.diff((row_ink > 0.01).astype(np.int8)) == 1) / ink.shape[0]
+    rules = np.count_nonzero(row_ink > 0.6) / ink.shape[0]
+    return np.concatenate(([math.log(height / width), pixels.mean() / 255, pixels.std() / 128,
+                            ink.mean(), lines, rules], grid))
+
+
+def _page_pixels(page, width, height):
+    """
+    Small grayscale image of a page. A scanned page that is one full-page JPEG is
+    decoded at reduced size (JPEG draft mode) instead of rendered, which avoids
+    decoding the full-resolution scan.
+    """
+    if page.get_rotation() == 0:
+        objects = list(itertools.islice(page.get_objects(max_depth=1), 2))
+        if len(objects) == 1 and objects[0].type == pdfium.raw.FPDF_PAGEOBJ_IMAGE:
+            image_object = objects[0]
+            left, bottom, right, top = image_object.get_bounds()
+            if (image_object.get_filters() == ['DCTDecode']
+                    and right - left >= 0.98 * width and top - bottom >= 0.98 * height):
+                image = Image.open(io.BytesIO(image_object.get_data(decode_simple=True)))
+                target = (RENDER_WIDTH, max(1, round(RENDER_WIDTH * height / width)))
+                image.draft('L', target)
+                return np.asarray(image.convert('L').resize(target, Image.BILINEAR))
+    return np.asarray(page.render(scale=RENDER_WIDTH / width, grayscale=True).to_pil().convert('L'))
+
+
+def page_features(pdf_path):
+    """
+    Layout features and keyword tokens per page, from a small grayscale image and
+    the text layer. Scanned pages have no text layer and rely on layout alone.
+
+    Returns:
+        list: (layout feature vector, token set) per page
+    """
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        features = []
+        for i in range(len(pdf)):
+            page = pdf[i]
+            width, height = page.get_size()
+            textpage = page.get_textpage()
+            tokens = set(TOKEN_PATTERN.findall(textpage.get_text_range().lower()))
+            textpage.close()
+            pixels = _page_pixels(page, width, height)
+            page.close()
+            features.append((_layout_features(pixels, width, height), tokens))
+        return features
+    finally:
+        pdf.close()
+
+
+def _labelled_pages(pdf_path, summaries):
+    features = page_features(pdf_path)
+    for summary in summaries:
+        name = summary.get('matched_blueprint_name')
+        for index in summary.get('page_indices') or []:
+            if name and index < len(features):
+                yield index, features[index], name
+
+
+def training_examples(pdf_path, summaries):
+    """
+    Label the pages of a processed document with the blueprint BDA matched.
+
+    Args:
+        pdf_path (str): The document that was sent to BDA
+        summaries (list): `get_summaries` output for its custom outputs
+
+    Returns:
+        list: (layout feature vector, token set, blueprint name) per matched page
+    """
+    return [(*features, name) for _, features, name in _labelled_pages(pdf_path, summaries)]
+
+
+def document_hash(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def _load_records(path):
+    try:
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def _record_key(record):
+    if 'document' in record:
+        return record['document'], record['page']
+    # Records without a document key: only exact copies are duplicates
+    return json.dumps(record, sort_keys=True)
+
+
+def update_history(path, pdf_path, summaries, source_path=None, page_map=None):
+    """
+    Store the labelled pages of a processed document in a JSON lines history file.
+
+    Records are keyed by document hash and page index, and the records of a
+    document replace the ones of an earlier run, so processing the same
+    document again does not duplicate its pages (duplicates would land in both
+    the training and the held-out folds of `accuracy_report`).
+
+    Args:
+        path (str): History file
+        pdf_path (str): The document that was sent to BDA
+        summaries (list): `get_summaries` output for its custom outputs
+        source_path (str): The original document when `pdf_path` is a filtered
+            copy; it is hashed instead, since a re-saved PDF differs per run
+        page_map (dict): Page of `pdf_path` -> page of `source_path`
+
+    Returns:
+        int: Records in the history file
+    """
+    document = document_hash(source_path or pdf_path)
+    page_map = page_map or {}
+    records = {}
+    for record in _load_records(path):
+        if record.get('document') != document:
+            records[_record_key(record)] = record
+    for index, (layout, tokens), label in _labelled_pages(pdf_path, summaries):
+        record = {'document': document, 'page': page_map.get(index, index),
+                  'layout': np.asarray(layout).tolist(), 'tokens': sorted(tokens), 'label': label}
+        records[_record_key(record)] = record
+    with open(path, 'w') as f:
+        for record in records.values():
+            f.write(json.dumps(record) + '\n')
+    return len(records)
+
+
+def load_examples(path):
+    """Labelled pages from a history file written by `update_history`; empty if it does not exist."""
+    return [(np.asarray(r['layout']), set(r['tokens']), r['label']) for r in _load_records(path)]
+
+
+class PreClassifier:
+    """
+    Nearest-centroid page classifier over standardized layout features and
+    class keywords, trained on pages labelled with BDA's own blueprint matches.
+
+    Example:
+        classifier = PreClassifier().fit(examples)
+        classifier.blueprint_subset(page_features('documents/lending_package.pdf'))
+    """
+
+    def __init__(self, keywords_per_class=KEYWORDS_PER_CLASS, keyword_weight=KEYWORD_WEIGHT):
+        self.keywords_per_class = keywords_per_class
+        self.keyword_weight = keyword_weight
+        self.labels = []
+        self.keywords = []
+
+    def _select_keywords(self, tokens, labels):
+        keywords = set()
+        for label in self.labels:
+            inside = [t for t, l in zip(tokens, labels) if l == label]
+            outside = [t for t, l in zip(tokens, labels) if l != label]
+            frequency_in = Counter(token for page in inside for token in page)
+            frequency_out = Counter(token for page in outside for token in page)
+            lift = {token: count / len(inside) - frequency_out[token] / max(1, len(outside))
+                    for token, count in frequency_in.items()}
+            best = sorted((t for t in lift if lift[t] >= MIN_KEYWORD_LIFT), key=lambda t: (-lift[t], t))
+            keywords.update(best[:self.keywords_per_class])
+        return sorted(keywords)
+
+    def _matrix(self, layouts, tokens):
+        layout = (np.asarray(layouts, dtype=np.float64) - self.mean) / self.std
+        keyword = np.array([[token in page for token in self.keywords] for page in tokens],
+                           dtype=np.float64).reshape(len(tokens), len(self.keywords))
+        return np.hstack([layout, keyword * self.keyword_weight])
+
+    def fit(self, examples):
+        layouts, tokens, labels = zip(*examples)
+        self.labels = sorted(set(labels))
+        self.keywords = self._select_keywords(tokens, labels)
+        layouts = np.asarray(layouts, dtype=np.float64)
+        self.mean = layouts.mean(axis=0)
+        self.std = layouts.std(axis=0) + 1e-6
+        matrix = self._matrix(layouts, tokens)
+        label_index = np.array([self.labels.index(label) for label in labels])
+        self.centroids = np.stack([matrix[label_index == i].mean(axis=0) for i in range(len(self.labels))])
+        # Softmax scale: the typical squared distance of a page to its own centroid
+        spread = ((matrix - self.centroids[label_index]) ** 2).sum(axis=1).mean()
+        self.temperature = float(spread) if spread > 0 else float(matrix.shape[1])
+        return self
+
+    def predict_proba(self, features):
+        """(pages, labels) probabilities for `page_features` output."""
+        layouts, tokens = zip(*features)
+        matrix = self._matrix(layouts, tokens)
+        distances = ((matrix[:, None, :] - self.centroids[None, :, :]) ** 2).sum(axis=2)
+        scores = -(distances - distances.min(axis=1, keepdims=True)) / self.temperature
+        probabilities = np.exp(scores)
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def predict(self, features):
+        return [self.labels[i] for i in self.predict_proba(features).argmax(axis=1)]
+
+    def page_candidates(self, features, coverage=COVERAGE):
+        """Per page, the most likely blueprints until they cover `coverage` probability."""
+        candidates = []
+        for row in self.predict_proba(features):
+            order = np.argsort(-row)
+            count = int(np.searchsorted(np.cumsum(row[order]), coverage)) + 1
+            candidates.append([self.labels[i] for i in order[:count]])
+        return candidates
+
+    def blueprint_subset(self, features, coverage=COVERAGE, max_blueprints=MAX_BLUEPRINTS):
+        """
+        Blueprints to attach for a document, or None when the classifier is not
+        confident enough to narrow the set below `max_blueprints` (use the full project).
+        """
+        subset = sorted({label for page in self.page_candidates(features, coverage) for label in page})
+        return subset if len(subset) <= max_blueprints else None
+
+    def classify_document(self, pdf_path, coverage=COVERAGE, max_blueprints=MAX_BLUEPRINTS):
+        """
+        Returns:
+            dict: `subset` (blueprint names or None), per page `predictions` and `ms_per_page`
+        """
+        start_time = time.perf_counter()
+        features = page_features(pdf_path)
+        subset = self.blueprint_subset(features, coverage, max_blueprints)
+        elapsed = time.perf_counter() - start_time
+        return {
+            'subset': subset,
+            'predictions': self.predict(features),
+            'ms_per_page': round(elapsed * 1000 / max(1, len(features)), 2)
+        }
+
+    def to_dict(self):
+        return {
+            'labels': self.labels, 'keywords': self.keywords, 'keyword_weight': self.keyword_weight,
+            'mean': self.mean.tolist(), 'std': self.std.tolist(),
+            'centroids': self.centroids.tolist(), 'temperature': self.temperature
+        }
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            state = json.load(f)
+        classifier = cls(keyword_weight=state['keyword_weight'])
+        classifier.labels, classifier.keywords = state['labels'], state['keywords']
+        classifier.temperature = state['temperature']
+        classifier.mean, classifier.std, classifier.centroids = (
+            np.asarray(state[key]) for key in ('mean', 'std', 'centroids'))
+        return classifier
+
+
+def accuracy_report(examples, folds=5, coverage=COVERAGE, max_blueprints=MAX_BLUEPRINTS, **options):
+    """
+    Cross-validated agreement with BDA's matches: every page is predicted by a
+    classifier that was not trained on it.
+
+    Returns:
+        dict: top-1 `accuracy`, `subset_recall` (BDA's blueprint is among the page
+        candidates), mean `candidates_per_page`, `ms_per_page` for prediction and
+        per class accuracy
+    """
+    folds = max(2, min(folds, len(examples)))
+    # Stratified folds: the pages of each blueprint are spread over all folds
+    seen = Counter()
+    fold_of = []
+    for *_, label in examples:
+        fold_of.append(seen[label] % folds)
+        seen[label] += 1
+
+    correct, covered, candidates, seconds = [], [], [], 0.0
+    per_class = {}
+    for fold in range(folds):
+        train = [e for e, f in zip(examples, fold_of) if f != fold]
+        test = [e for e, f in zip(examples, fold_of) if f == fold]
+        if not test or len({label for *_, label in train}) < 2:
+            continue
+        classifier = PreClassifier(**options).fit(train)
+        features = [(layout, tokens) for layout, tokens, _ in test]
+        start_time = time.perf_counter()
+        predictions = classifier.predict(features)
+        page_candidates = classifier.page_candidates(features, coverage)
+        seconds += time.perf_counter() - start_time
+        for (*_, label), prediction, page in zip(test, predictions, page_candidates):
+            correct.append(prediction == label)
+            covered.append(label in page)
+            candidates.append(len(page))
+            per_class.setdefault(label, []).append(prediction == label)
+
+    report = {
+        'pages': len(correct),
+        'accuracy': round(float(np.mean(correct)), 3) if correct else None,
+        'subset_recall': round(float(np.mean(covered)), 3) if covered else None,
+        'candidates_per_page': round(float(np.mean(candidates)), 2) if candidates else None,
+        'blueprints': len({label for *_, label in examples}),
+        'ms_per_page': round(seconds * 1000 / max(1, len(correct)), 3),
+        'per_class': {label: round(float(np.mean(hits)), 3) for label, hits in sorted(per_class.items())}
+    }
+    print(f"{report['pages']} pages, {folds}-fold: top-1 accuracy {report['accuracy']}, "
+          f"BDA match in candidates {report['subset_recall']}, "
+          f"{report['candidates_per_page']} of {report['blueprints']} blueprints per page, "
+          f"{report['ms_per_page']} ms per page")
+    return report
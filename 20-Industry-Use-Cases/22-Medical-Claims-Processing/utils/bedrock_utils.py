@@ -1,10 +1,17 @@
 import boto3
 from botocore.exceptions import ClientError
 from .helper_functions import wait_for_completion
+from .chunking_profiler import hierarchical_chunking_configuration
 import concurrent.futures
+from collections import Counter
+import hashlib
+import json
 import logging
+import os
 import random
 import string
+import time
+from datetime import datetime, timezone
 from IPython.display import display
 import pandas as pd
 from ipywidgets import Tab, Output, HTML
@@ -309,26 +316,15 @@ def create_knowledge_base(bedrock_agent, kb_name,
         raise
 
 
-def create_data_source(bedrock_agent, knowledge_base_id, datasource_name='claims-eoc-datasource') :
+def create_data_source(bedrock_agent, knowledge_base_id, datasource_name='claims-eoc-datasource',
+                       chunking_configuration=None) :
 
     data_source_configuration = {
         'type': 'CUSTOM'
     }
     
-    chunking_configuration = {
-        'chunkingStrategy': 'HIERARCHICAL',
-        'hierarchicalChunkingConfiguration': {
-            'levelConfigurations': [
-                {
-                    'maxTokens': 1500
-                },
-                {
-                    'maxTokens': 300
-                },
-            ],
-            'overlapTokens': 60
-        }
-    }
+    # Hierarchical 1500/300 tokens with 60 overlap unless given; see chunking_profiler to compare settings offline
+    chunking_configuration = chunking_configuration or hierarchical_chunking_configuration()
     
     ds_list = bedrock_agent.list_data_sources(knowledgeBaseId=knowledge_base_id)
     existing_ds = next((ds for 
@@ -367,61 +363,255 @@ def create_data_source(bedrock_agent, knowledge_base_id, datasource_name='claims
         return datasource_id, status_response['dataSource']['status']
             
 
-def ingest_and_wait(bedrock_agent, data_source_id , knowledge_base_id, documents):
+# ingest/get/delete_knowledge_base_documents accept at most 10 documents per call
+KB_DOCUMENTS_BATCH_SIZE = 10
+KB_INGEST_WORKERS = 4
 
-    print("Ingesting documents...")
-    bedrock_agent.ingest_knowledge_base_documents(
-        dataSourceId=data_source_id,
-        knowledgeBaseId=knowledge_base_id,
-        documents=[
-            get_document_configuration(document['document_id'], document['plan_name'], document['document_uri'])
-            for document in documents
-        ]
-    )
-    
-    def wait_for_single_document(document):
-        return wait_for_completion(
-            client=bedrock_agent,
-            get_status_function=bedrock_agent.get_knowledge_base_documents,
-            status_kwargs={
-                'dataSourceId': data_source_id,
-                'knowledgeBaseId': knowledge_base_id,
-                'documentIdentifiers': [{
-                    'custom': {
-                        'id': document['document_id']
-                    },
-                    'dataSourceType': 'CUSTOM'}]
-            },
-            completion_states=['INDEXED'],
-            error_states=['FAILED'],
-            status_path_in_response='documentDetails[0].status',
-            max_iterations=5,
-            delay=5, verbose=False
+
+def _batches(items, batch_size=KB_DOCUMENTS_BATCH_SIZE):
+    return [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+
+
+def _document_identifier(document_id):
+    return {'custom': {'id': document_id}, 'dataSourceType': 'CUSTOM'}
+
+
+def _check_unique(document_ids):
+    duplicates = sorted(document_id for document_id, count in Counter(document_ids).items() if count > 1)
+    if duplicates:
+        raise ValueError(f"Duplicate document ids: {', '.join(duplicates)}")
+
+
+class DocumentsTimeoutError(TimeoutError):
+    """Documents did not reach a final state in time; `details` holds the ones that did."""
+
+    def __init__(self, message, pending, details):
+        super().__init__(message)
+        self.pending = pending
+        self.details = details
+
+
+def wait_for_documents(bedrock_agent, data_source_id, knowledge_base_id, document_ids,
+                       completion_states=('INDEXED',), error_states=('FAILED',), max_iterations=20, delay=5):
+    """
+    Poll a batch of documents with one multi-identifier `get_knowledge_base_documents`
+    call per cycle; documents that reached a final state are dropped from the next call.
+    Documents the API leaves out of a response stay pending.
+
+    Returns:
+        dict: document id -> document details, for every document in `document_ids`
+
+    Raises:
+        ValueError: `document_ids` contains duplicates
+        DocumentsTimeoutError: (a TimeoutError) listing the ids still pending
+    """
+    _check_unique(document_ids)
+    details = {}
+    pending = list(document_ids)
+    for _ in range(max_iterations):
+        for batch in _batches(pending):
+            response = bedrock_agent.get_knowledge_base_documents(
+                dataSourceId=data_source_id,
+                knowledgeBaseId=knowledge_base_id,
+                documentIdentifiers=[_document_identifier(document_id) for document_id in batch]
+            )
+            for detail in response['documentDetails']:
+                document_id = detail.get('identifier', {}).get('custom', {}).get('id')
+                if document_id in batch and (detail['status'] in completion_states or detail['status'] in error_states):
+                    details[document_id] = detail
+        pending = [document_id for document_id in pending if document_id not in details]
+        if not pending:
+            return details
+        time.sleep(delay) # nosemgrep
+    raise DocumentsTimeoutError(
+        f"Operation timed out after {max_iterations} iterations, still pending: {', '.join(pending)}", pending, details)
+
+
+def ingest_and_wait(bedrock_agent, data_source_id , knowledge_base_id, documents,
+                    batch_size=KB_DOCUMENTS_BATCH_SIZE, max_workers=KB_INGEST_WORKERS, max_iterations=20, delay=5,
+                    raise_on_failure=True):
+    """
+    Ingest documents in API-sized batches, submitted concurrently, and wait until
+    all of them are indexed.
+
+    Args:
+        documents (list): Dicts with document_id, plan_name and document_uri
+        batch_size (int): Documents per ingest and status call (at most 10)
+        max_workers (int): Batches submitted and polled at the same time
+        raise_on_failure (bool): Raise when a document ends up FAILED
+
+    Returns:
+        list: `get_knowledge_base_documents` details per document, in input order
+    """
+    _check_unique([document['document_id'] for document in documents])
+    batches = _batches(documents, batch_size)
+    print(f"Ingesting {len(documents)} documents in {len(batches)} batches...")
+
+    def ingest_batch(batch):
+        bedrock_agent.ingest_knowledge_base_documents(
+            dataSourceId=data_source_id,
+            knowledgeBaseId=knowledge_base_id,
+            documents=[
+                get_document_configuration(document['document_id'], document['plan_name'], document['document_uri'])
+                for document in batch
+            ]
         )
+        return wait_for_documents(bedrock_agent, data_source_id, knowledge_base_id,
+                                  [document['document_id'] for document in batch],
+                                  max_iterations=max_iterations, delay=delay)
 
-    # Use ThreadPoolExecutor to run wait_for_completion in parallel
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        # Submit all tasks
-        future_to_document = {executor.submit(wait_for_single_document, document): document for document in documents}
-        
-        # Wait for all tasks to complete and collect results
-        results = []
-        for future in concurrent.futures.as_completed(future_to_document):
-            document = future_to_document[future]
+    details, pending = {}, []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for future in concurrent.futures.as_completed([executor.submit(ingest_batch, batch) for batch in batches]):
             try:
-                result = future.result()
-                result.update(document)
-                results.append(result['documentDetails'][0])
-            except Exception as exc:
-                print(f"Document {document['document_id']} generated an exception: {exc}")
-                results.append((document, None))
-                raise
-    print("Ingestion complete.")
+                details.update(future.result())
+            except DocumentsTimeoutError as e:
+                # Keep waiting for the other batches so their results are not lost
+                details.update(e.details)
+                pending += e.pending
+    if pending:
+        raise DocumentsTimeoutError(f"Timed out waiting for {len(pending)} of {len(documents)} documents: "
+                                    f"{', '.join(pending)}", pending, details)
 
-    # Consolidate and return results
+    results = [details[document['document_id']] for document in documents]
+    failed = [result for result in results if result['status'] == 'FAILED']
+    for result in failed:
+        print(f"Document {result['identifier']['custom']['id']} failed: {result.get('statusReason')}")
+    if failed and raise_on_failure:
+        raise Exception(f"Operation failed with status: FAILED for {len(failed)} of {len(documents)} documents")
+    print("Ingestion complete.")
     return results
 
 
+def delete_documents(bedrock_agent, data_source_id, knowledge_base_id, document_ids, batch_size=KB_DOCUMENTS_BATCH_SIZE):
+    """Delete documents from a custom data source in API-sized batches; deletion completes asynchronously."""
+    for batch in _batches(list(document_ids), batch_size):
+        bedrock_agent.delete_knowledge_base_documents(
+            dataSourceId=data_source_id,
+            knowledgeBaseId=knowledge_base_id,
+            documentIdentifiers=[_document_identifier(document_id) for document_id in batch]
+        )
+
+
+def document_content_hash(document, s3_client=None):
+    """
+    sha256 of the document's `local_path` when it has one, otherwise the S3 ETag
+    of `document_uri` (no download).
+    """
+    if document.get('local_path'):
+        digest = hashlib.sha256()
+        with open(document['local_path'], 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return f"sha256:{digest.hexdigest()}"
+    bucket, key = document['document_uri'][len('s3://'):].split('/', 1)
+    response = (s3_client or boto3.client('s3')).head_object(Bucket=bucket, Key=key)
+    etag = response['ETag'].strip('"')
+    return f"etag:{etag}"
+
+
+def _load_kb_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_kb_manifest(manifest_path, manifest):
+    os.makedirs(os.path.dirname(manifest_path) or '.', exist_ok=True)
+    temp_path = f'{manifest_path}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+
+def sync_knowledge_base_documents(bedrock_agent, data_source_id, knowledge_base_id, documents,
+                                  manifest_path='data/kb_manifest.json', s3_client=None, dry_run=False, **ingest_options):
+    """
+    Bring a custom data source in line with `documents`, touching only the delta.
+
+    A manifest keeps the content hash and plan name of every ingested document_id.
+    New documents and documents whose content, plan name or URI changed are
+    ingested with `ingest_and_wait`; documents in the manifest but no longer in
+    `documents` are deleted. A manifest written for another knowledge base or data
+    source is ignored, so everything is ingested again.
+
+    Args:
+        documents (list): Dicts with document_id, plan_name, document_uri and
+            optionally local_path (hashed instead of reading the S3 ETag)
+        manifest_path (str): JSON manifest, updated after each step
+        dry_run (bool): Only report what would change
+        **ingest_options: Passed to `ingest_and_wait` (batch_size, max_workers, ...)
+
+    Returns:
+        list: One row per document with document_id, plan_name, action
+        ('added', 'updated', 'unchanged', 'deleted') and status
+    """
+    manifest = _load_kb_manifest(manifest_path)
+    if (manifest.get('knowledge_base_id'), manifest.get('data_source_id')) != (knowledge_base_id, data_source_id):
+        manifest = {'knowledge_base_id': knowledge_base_id, 'data_source_id': data_source_id, 'documents': {}}
+    entries = manifest['documents']
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        hashes = list(executor.map(lambda document: document_content_hash(document, s3_client), documents))
+
+    # Rows in the order of `documents`, followed by the deleted documents
+    rows, changed = {}, []
+    for document, content_hash in zip(documents, hashes):
+        entry = entries.get(document['document_id'])
+        current = {'plan_name': document['plan_name'], 'document_uri': document['document_uri'], 'content_hash': content_hash}
+        action = 'updated' if entry else 'added'
+        if entry and all(entry.get(key) == value for key, value in current.items()) and entry.get('status') == 'INDEXED':
+            action = 'unchanged'
+        else:
+            changed.append((document, current))
+        rows[document['document_id']] = {'document_id': document['document_id'], 'plan_name': document['plan_name'],
+                                         'action': action, 'status': entry['status'] if action == 'unchanged' else None}
+    removed = sorted(set(entries) - set(rows))
+    for document_id in removed:
+        rows[document_id] = {'document_id': document_id, 'plan_name': entries[document_id].get('plan_name'),
+                             'action': 'deleted', 'status': None}
+
+    counts = Counter(row['action'] for row in rows.values())
+    print(f"Knowledge base sync: {counts['added']} new, {counts['updated']} changed, "
+          f"{counts['deleted']} removed, {counts['unchanged']} unchanged")
+    if dry_run:
+        return list(rows.values())
+
+    if removed:
+        delete_documents(bedrock_agent, data_source_id, knowledge_base_id, removed)
+        for document_id in removed:
+            entries.pop(document_id)
+            rows[document_id]['status'] = 'DELETING'
+        _save_kb_manifest(manifest_path, manifest)
+
+    if changed:
+        details = {}
+        try:
+            results = ingest_and_wait(bedrock_agent, data_source_id, knowledge_base_id,
+                                      [document for document, _ in changed], raise_on_failure=False, **ingest_options)
+            details = {result['identifier']['custom']['id']: result for result in results}
+        except DocumentsTimeoutError as e:
+            # Record the documents that did finish; the pending ones are ingested again next run
+            details = e.details
+            raise
+        finally:
+            for document, current in changed:
+                result = details.get(document['document_id'])
+                if result:
+                    entries[document['document_id']] = {**current, 'status': result['status'],
+                                                        'updated_at': datetime.now(timezone.utc).isoformat()}
+                    rows[document['document_id']]['status'] = result['status']
+            _save_kb_manifest(manifest_path, manifest)
+
+    rows = list(rows.values())
+    failed = [row['document_id'] for row in rows if row['status'] == 'FAILED']
+    if failed:
+        raise Exception(f"Operation failed with status: FAILED for {', '.join(failed)}")
+    return rows
+
+
 def add_lambda_permission(
     function_name,
     principal,
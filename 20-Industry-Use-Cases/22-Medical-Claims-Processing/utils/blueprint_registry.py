@@ -0,0 +1,154 @@
+import hashlib
+import json
+import threading
+import time
+
+
+DEFAULT_TTL_SECONDS = 300
+
+
+def schema_hash(schema):
+    """Hash of a blueprint schema that ignores key order and whitespace."""
+    if isinstance(schema, str):
+        schema = json.loads(schema)
+    canonical = json.dumps(schema, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class BlueprintRegistry:
+    """
+    Name -> blueprint index for an account, built from every page of `list_blueprints`.
+
+    The index is reused for `ttl_seconds`, so a bulk setup lists blueprints once.
+    Deployed schema hashes are remembered per (ARN, last modified time); the
+    deployed schema is only fetched for blueprints whose hash is not known yet, and
+    `create_or_update` skips the update when the local schema and stage match.
+
+    Example:
+        registry = BlueprintRegistry(bda_client)
+        arn = registry.create_or_update('claim-form', 'DOCUMENT', 'LIVE', schema)
+    """
+
+    def __init__(self, bda_client, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.bda_client = bda_client
+        self.ttl_seconds = ttl_seconds
+        self.entries = {}
+        self.loaded_at = None
+        self.schema_hashes = {}
+        self.lock = threading.RLock()
+        self.calls = {'list_blueprints': 0, 'get_blueprint': 0, 'create_blueprint': 0, 'update_blueprint': 0}
+
+    def _count(self, operation):
+        with self.lock:
+            self.calls[operation] += 1
+
+    def refresh(self):
+        """Rebuild the index from all pages of `list_blueprints`."""
+        entries = {}
+        kwargs = {'blueprintStageFilter': 'ALL'}
+        while True:
+            response = self.bda_client.list_blueprints(**kwargs)
+            self._count('list_blueprints')
+            for blueprint in response.get('blueprints', []):
+                name = blueprint.get('blueprintName')
+                if not name:
+                    continue
+                # A name can be listed once per stage; keep the LIVE entry when there are both
+                if name not in entries or blueprint.get('blueprintStage') == 'LIVE':
+                    entries[name] = blueprint
+            if not response.get('nextToken'):
+                break
+            kwargs['nextToken'] = response['nextToken']
+        with self.lock:
+            self.entries = entries
+            self.loaded_at = time.time()
+        return entries
+
+    @property
+    def index(self):
+        with self.lock:
+            expired = self.loaded_at is None or time.time() - self.loaded_at > self.ttl_seconds
+        return self.refresh() if expired else self.entries
+
+    def invalidate(self):
+        with self.lock:
+            self.loaded_at = None
+
+    def get(self, name):
+        """Listing entry (blueprintArn, blueprintVersion, blueprintStage, ...) for `name`, or None."""
+        return self.index.get(name)
+
+    def arn(self, name):
+        entry = self.get(name)
+        return entry['blueprintArn'] if entry else None
+
+    def deployed_schema_hash(self, entry):
+        key = (entry['blueprintArn'], str(entry.get('lastModifiedTime')))
+        with self.lock:
+            if key in self.schema_hashes:
+                return self.schema_hashes[key]
+        response = self.bda_client.get_blueprint(blueprintArn=entry['blueprintArn'],
+                                                 blueprintStage=entry.get('blueprintStage', 'LIVE'))
+        self._count('get_blueprint')
+        value = schema_hash(response['blueprint']['schema'])
+        with self.lock:
+            self.schema_hashes[key] = value
+        return value
+
+    def _remember(self, blueprint, local_hash):
+        entry = {key: blueprint.get(key) for key in
+                 ('blueprintArn', 'blueprintName', 'blueprintVersion', 'blueprintStage', 'creationTime', 'lastModifiedTime')}
+        with self.lock:
+            self.entries[entry['blueprintName']] = entry
+            self.schema_hashes[(entry['blueprintArn'], str(entry.get('lastModifiedTime')))] = local_hash
+
+    def create_or_update(self, blueprint_name, blueprint_type, blueprint_stage, blueprint_schema):
+        """
+        Create the blueprint, update it if its schema or stage changed, or leave it alone.
+
+        Returns:
+            tuple: (blueprint ARN, action) where action is 'created', 'updated' or 'unchanged'
+        """
+        local_hash = schema_hash(blueprint_schema)
+        schema = blueprint_schema if isinstance(blueprint_schema, str) else json.dumps(blueprint_schema)
+        entry = self.get(blueprint_name)
+
+        if not entry:
+            print(f'No existing blueprint found with name={blueprint_name}, creating custom blueprint')
+            response = self.bda_client.create_blueprint(
+                blueprintName=blueprint_name,
+                type=blueprint_type,
+                blueprintStage=blueprint_stage,
+                schema=schema
+            )
+            self._count('create_blueprint')
+            action = 'created'
+        elif entry.get('blueprintStage') == blueprint_stage and self.deployed_schema_hash(entry) == local_hash:
+            print(f'Found existing blueprint with name={blueprint_name}, schema and stage unchanged')
+            return entry['blueprintArn'], 'unchanged'
+        else:
+            print(f'Found existing blueprint with name={blueprint_name}, updating Stage and Schema')
+            response = self.bda_client.update_blueprint(
+                blueprintArn=entry['blueprintArn'],
+                blueprintStage=blueprint_stage,
+                schema=schema
+            )
+            self._count('update_blueprint')
+            action = 'updated'
+
+        blueprint = dict(response['blueprint'])
+        blueprint.setdefault('blueprintName', blueprint_name)
+        blueprint.setdefault('blueprintStage', blueprint_stage)
+        self._remember(blueprint, local_hash)
+        return blueprint['blueprintArn'], action
+
+
+_registries = {}
+
+
+def get_blueprint_registry(bda_client, ttl_seconds=DEFAULT_TTL_SECONDS):
+    """Shared registry per client, so repeated helper calls reuse one listing."""
+    key = id(bda_client)
+    if key not in _registries or _registries[key].bda_client is not bda_client:
+        _registries[key] = BlueprintRegistry(bda_client, ttl_seconds=ttl_seconds)
+    return _registries[key]
@@ -0,0 +1,219 @@
+import hashlib
+import json
+import re
+import time
+from datetime import datetime
+
+
+_YEAR = r'\d{4}'
+_MONTH = r'(0[1-9]|1[0-2])'
+_DAY = r'(0[1-9]|[12]\d|3[01])'
+
+# Date formats that blueprints ask for in a field's instruction. Precompiled patterns
+# are used instead of strptime, which dominates validation time on date-heavy forms.
+INSTRUCTION_DATE_FORMATS = {
+    'YYYY-MM-DD': re.compile(f'^{_YEAR}-{_MONTH}-{_DAY}$').match,
+    'MM/DD/YYYY': re.compile(f'^{_MONTH}/{_DAY}/{_YEAR}$').match,
+    'DD/MM/YYYY': re.compile(f'^{_DAY}/{_MONTH}/{_YEAR}$').match,
+}
+
+FORMAT_CHECKS = {
+    'date': INSTRUCTION_DATE_FORMATS['YYYY-MM-DD'],
+    'date-time': lambda v: _parses_iso(v),
+    'email': re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$').match,
+}
+
+_validator_cache = {}
+
+
+def _parses_iso(value):
+    try:
+        datetime.fromisoformat(value.replace('Z', '+00:00'))
+        return True
+    except ValueError:
+        return False
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+TYPE_CHECKS = {
+    'string': lambda v: isinstance(v, str),
+    'number': _is_number,
+    'integer': lambda v: isinstance(v, int) and not isinstance(v, bool),
+    'boolean': lambda v: isinstance(v, bool),
+    'array': lambda v: isinstance(v, list),
+    'object': lambda v: isinstance(v, dict),
+}
+
+
+def _is_scalar(value):
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _resolve(node, definitions):
+    """Follow `$ref`s to a schema node; returns (node, name of the last definition or None)."""
+    name, seen = None, set()
+    while node.get('$ref'):
+        name = node['$ref'].rsplit('/', 1)[-1]
+        if name in seen:
+            raise ValueError(f'$ref cycle through definition {name!r}')
+        seen.add(name)
+        node = definitions[name]
+    return node, name
+
+
+def _compile_node(node, definitions, allow_additional, compiled=None):
+    """Compile one schema node into a function `check(value, path, errors)`."""
+    compiled = {} if compiled is None else compiled
+    node, ref_name = _resolve(node, definitions)
+    if ref_name is not None:
+        if ref_name in compiled:
+            # Recursive definition: check against it once it is compiled
+            return compiled[ref_name] or (lambda value, path, errors: compiled[ref_name](value, path, errors))
+        compiled[ref_name] = None
+        compiled[ref_name] = _compile_node(node, definitions, allow_additional, compiled)
+        return compiled[ref_name]
+    node_type = node.get('type', 'object' if 'properties' in node else None)
+    checks = []
+
+    if node_type in TYPE_CHECKS:
+        type_check = TYPE_CHECKS[node_type]
+
+        def check_type(value, path, errors):
+            if not type_check(value):
+                errors.append(f'{path}: expected {node_type}, got {type(value).__name__}')
+        checks.append(check_type)
+
+    if 'enum' in node:
+        allowed = frozenset(node['enum'])
+
+        def check_enum(value, path, errors):
+            # Lists and objects are never allowed values (and are not hashable)
+            if not _is_scalar(value) or (value not in ('', None) and value not in allowed):
+                errors.append(f'{path}: {value!r} not in {sorted(allowed, key=str)}')
+        checks.append(check_enum)
+
+    if node_type == 'string':
+        format_check = FORMAT_CHECKS.get(node.get('format'))
+        format_name = node.get('format')
+        if not format_check:
+            instruction = node.get('instruction', '')
+            for token, pattern in INSTRUCTION_DATE_FORMATS.items():
+                if token in instruction:
+                    format_check = pattern
+                    format_name = token
+                    break
+        if format_check:
+            checks.append(lambda value, path, errors: not isinstance(value, str) or value == '' or format_check(value) or errors.append(f'{path}: {value!r} does not match format {format_name}'))
+
+    if node_type == 'object' and 'properties' in node:
+        properties = {name: _compile_node(child, definitions, allow_additional, compiled) for name, child in node['properties'].items()}
+        required = tuple(node.get('required', ()))
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if value.get(name) in (None, ''):
+                    errors.append(f'{path}.{name}: required field missing')
+            for name, field_value in value.items():
+                field_check = properties.get(name)
+                if field_check is None:
+                    if not allow_additional:
+                        errors.append(f'{path}.{name}: unexpected field')
+                elif field_value is not None:
+                    field_check(field_value, f'{path}.{name}', errors)
+        checks.append(check_object)
+
+    if node_type == 'array' and 'items' in node:
+        item_check = _compile_node(node['items'], definitions, allow_additional, compiled)
+
+        def check_array(value, path, errors):
+            if not isinstance(value, list):
+                return
+            for i, item in enumerate(value):
+                if item is not None:
+                    item_check(item, f'{path}[{i}]', errors)
+        checks.append(check_array)
+
+    if len(checks) == 1:
+        return checks[0]
+
+    def check(value, path, errors):
+        for c in checks:
+            c(value, path, errors)
+    return check
+
+
+def compile_blueprint(blueprint_schema, allow_additional=False):
+    """
+    Compile a blueprint JSON schema into a validator function.
+
+    Compiled validators are cached by a hash of the canonical schema, so repeated
+    calls with the same blueprint are free. The returned function takes an
+    `inference_result` and returns a list of error strings (empty when valid).
+
+    Args:
+        blueprint_schema (dict|str): Blueprint schema as loaded from `data/blueprint(s)/*.json`
+        allow_additional (bool): Accept fields that are not defined in the blueprint
+
+    Returns:
+        callable: `validate(inference_result) -> list[str]`
+    """
+    if isinstance(blueprint_schema, str):
+        blueprint_schema = json.loads(blueprint_schema)
+    canonical = json.dumps(blueprint_schema, sort_keys=True, separators=(',', ':'))
+    cache_key = (hashlib.sha256(canonical.encode('utf-8')).hexdigest(), allow_additional)
+    if cache_key in _validator_cache:
+        return _validator_cache[cache_key]
+
+    definitions = blueprint_schema.get('definitions', {})
+    root = dict(blueprint_schema, type='object')
+    root_check = _compile_node(root, definitions, allow_additional)
+
+    def validate(inference_result):
+        errors = []
+        if not isinstance(inference_result, dict):
+            return [f'$: expected object, got {type(inference_result).__name__}']
+        root_check(inference_result, '$', errors)
+        return errors
+
+    validate.blueprint_class = blueprint_schema.get('class')
+    _validator_cache[cache_key] = validate
+    return validate
+
+
+def load_validator(schema_path, allow_additional=False):
+    with open(schema_path) as f:
+        return compile_blueprint(json.load(f), allow_additional=allow_additional)
+
+
+def validate_bulk(validator, inference_results):
+    """
+    Validate many inference results with one compiled validator.
+
+    Returns:
+        tuple: (indices of valid results, {index: errors} for malformed results)
+    """
+    valid, invalid = [], {}
+    for i, inference_result in enumerate(inference_results):
+        errors = validator(inference_result)
+        if errors:
+            invalid[i] = errors
+        else:
+            valid.append(i)
+    return valid, invalid
+
+
+def benchmark_validator(validator, inference_results, repeat=5):
+    """Best-of-`repeat` throughput of `validate_bulk` in results per second."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        validate_bulk(validator, inference_results)
+        best = min(best, time.perf_counter() - start)
+    rate = len(inference_results) / best if best > 0 else float('inf')
+    print(f"Validated {len(inference_results)} results in {best * 1000:.1f} ms ({rate:,.0f} results/s)")
+    return rate
@@ -0,0 +1,207 @@
+import itertools
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+from PyPDF2 import PdfReader
+
+
+PARENT_MAX_TOKENS = 1500
+CHILD_MAX_TOKENS = 300
+OVERLAP_TOKENS = 60
+
+EMBEDDING_DIMENSIONS = 1024
+# OpenSearch HNSW graph memory per vector: 1.1 * (4 * dimensions + 8 * M) bytes
+HNSW_M = 16
+
+# Words, numbers and single punctuation marks; close to, but usually below, the
+# embedding model's subword token count. Pass a real tokenizer for exact numbers.
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+
+def hierarchical_chunking_configuration(parent_max_tokens=PARENT_MAX_TOKENS, child_max_tokens=CHILD_MAX_TOKENS,
+                                        overlap_tokens=OVERLAP_TOKENS):
+    """`chunkingConfiguration` for a knowledge base data source with hierarchical chunking."""
+    return {
+        'chunkingStrategy': 'HIERARCHICAL',
+        'hierarchicalChunkingConfiguration': {
+            'levelConfigurations': [
+                {
+                    'maxTokens': parent_max_tokens
+                },
+                {
+                    'maxTokens': child_max_tokens
+                },
+            ],
+            'overlapTokens': overlap_tokens
+        }
+    }
+
+
+def _levels(chunking_configuration):
+    configuration = chunking_configuration['hierarchicalChunkingConfiguration']
+    parent, child = (level['maxTokens'] for level in configuration['levelConfigurations'])
+    return parent, child, configuration['overlapTokens']
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text)
+
+
+def document_tokens(pdf_path, tokenize=tokenize):
+    """
+    Extract the text of a PDF and count its tokens.
+
+    Returns:
+        dict: document name, page count, token count and text bytes per token
+    """
+    with open(pdf_path, 'rb') as pdf_file:
+        reader = PdfReader(pdf_file)
+        text = '\n'.join(page.extract_text() or '' for page in reader.pages)
+        pages = len(reader.pages)
+    tokens = len(tokenize(text))
+    return {
+        'document': os.path.basename(pdf_path),
+        'pages': pages,
+        'tokens': tokens,
+        'bytes_per_token': len(text.encode('utf-8')) / tokens if tokens else 0.0
+    }
+
+
+def _window_lengths(total, max_tokens, overlap):
+    """Lengths of the windows of `max_tokens` that overlap by `overlap` tokens and cover `total` tokens."""
+    if total <= max_tokens:
+        return np.array([total] if total else [], dtype=np.int64)
+    step = max_tokens - overlap
+    starts = np.arange(0, total - overlap, step)
+    return np.minimum(starts + max_tokens, total) - starts
+
+
+def chunk_lengths(token_count, chunking_configuration):
+    """
+    Token lengths of the parent and child chunks of a document. Parents cover the
+    document, children cover each parent; both layers overlap by `overlapTokens`.
+
+    Returns:
+        tuple: (parent lengths, child lengths, children per parent) as arrays
+    """
+    parent_max, child_max, overlap = _levels(chunking_configuration)
+    parents = _window_lengths(token_count, parent_max, overlap)
+    children = [_window_lengths(length, child_max, overlap) for length in parents]
+    return (parents,
+            np.concatenate(children) if children else np.array([], dtype=np.int64),
+            np.array([len(c) for c in children], dtype=np.int64))
+
+
+def index_size_bytes(vectors, text_bytes, dimensions=EMBEDDING_DIMENSIONS, hnsw_m=HNSW_M):
+    """Vector index estimate: HNSW graph and vectors plus the stored chunk text."""
+    return int(vectors * 1.1 * (4 * dimensions + 8 * hnsw_m) + text_bytes)
+
+
+def _summarize(documents, chunking_configuration, dimensions):
+    parents_total = children_total = embedded_tokens = text_bytes = 0
+    for document in documents:
+        parents, children, _ = chunk_lengths(document['tokens'], chunking_configuration)
+        parents_total += len(parents)
+        children_total += len(children)
+        embedded_tokens += int(children.sum())
+        # Child chunks are embedded and stored with their text; parent text is stored for retrieval
+        text_bytes += (children.sum() + parents.sum()) * document['bytes_per_token']
+    document_tokens_total = sum(document['tokens'] for document in documents)
+    return {
+        'parent_chunks': parents_total,
+        'child_chunks': children_total,
+        'embedding_calls': children_total,
+        'embedded_tokens': embedded_tokens,
+        'overlap_overhead': round(embedded_tokens / document_tokens_total - 1, 3) if document_tokens_total else 0.0,
+        'index_mb': round(index_size_bytes(children_total, text_bytes, dimensions) / 1e6, 2)
+    }
+
+
+def _print_histogram(title, values, bins):
+    print(title)
+    if len(values) == 0:
+        print('  (none)')
+        return
+    values = np.asarray(values)
+    if values.min() == values.max():
+        print(f'  {values[0]:15.0f} | {"#" * 40} {len(values)}')
+        return
+    counts, edges = np.histogram(values, bins=bins)
+    scale = 40 / max(1, counts.max())
+    for count, low, high in zip(counts, edges[:-1], edges[1:]):
+        print(f'  {low:7.0f} - {high:7.0f} | {"#" * int(np.ceil(count * scale)):<40} {count}')
+
+
+def profile_chunking(pdf_paths, chunking_configuration=None, tokenize=tokenize, dimensions=EMBEDDING_DIMENSIONS, bins=10):
+    """
+    Apply the knowledge base chunking settings to local PDFs, without ingesting them.
+
+    Args:
+        pdf_paths (list): PDF files, e.g. the EoC documents
+        chunking_configuration (dict): `chunkingConfiguration` as passed to
+            `create_data_source`; defaults to `hierarchical_chunking_configuration()`
+        tokenize (callable): Text -> tokens; a regex approximation by default
+        dimensions (int): Embedding dimensions, for the index size estimate
+        bins (int): Histogram bins
+
+    Returns:
+        dict: `documents` (DataFrame with tokens and chunks per document), `totals`
+        (chunks, embedding calls and tokens, overlap overhead, index MB) and the
+        token lengths of all `parent_tokens` and `child_tokens`
+    """
+    chunking_configuration = chunking_configuration or hierarchical_chunking_configuration()
+    start_time = time.time()
+    documents = [document_tokens(path, tokenize) for path in pdf_paths]
+    extract_seconds = time.time() - start_time
+
+    parent_tokens, child_tokens, rows = [], [], []
+    for document in documents:
+        parents, children, per_parent = chunk_lengths(document['tokens'], chunking_configuration)
+        parent_tokens.append(parents)
+        child_tokens.append(children)
+        rows.append({**document, 'parent_chunks': len(parents), 'child_chunks': len(children),
+                     'children_per_parent': round(float(per_parent.mean()), 1) if len(per_parent) else 0.0})
+    parent_tokens = np.concatenate(parent_tokens) if parent_tokens else np.array([])
+    child_tokens = np.concatenate(child_tokens) if child_tokens else np.array([])
+    totals = _summarize(documents, chunking_configuration, dimensions)
+
+    parent_max, child_max, overlap = _levels(chunking_configuration)
+    print(f'{len(documents)} documents, {sum(d["tokens"] for d in documents):,} tokens '
+          f'(text extracted in {extract_seconds:.1f}s), parent {parent_max} / child {child_max} / overlap {overlap}')
+    print(f'{totals["parent_chunks"]} parent chunks, {totals["child_chunks"]} child chunks = '
+          f'{totals["embedding_calls"]} embedding calls for {totals["embedded_tokens"]:,} tokens '
+          f'({totals["overlap_overhead"]:.0%} overlap overhead), index about {totals["index_mb"]} MB')
+    _print_histogram('Child chunks per document', [row['child_chunks'] for row in rows], bins)
+    _print_histogram('Parent chunk tokens', parent_tokens, bins)
+    _print_histogram('Child chunk tokens', child_tokens, bins)
+
+    return {
+        'documents': pd.DataFrame(rows),
+        'totals': totals,
+        'parent_tokens': parent_tokens,
+        'child_tokens': child_tokens
+    }
+
+
+def sweep_chunking(pdf_paths, parent_sizes=(1000, 1500, 2000), child_sizes=(200, 300, 500), overlaps=(0, 30, 60),
+                   tokenize=tokenize, dimensions=EMBEDDING_DIMENSIONS):
+    """
+    Chunk counts, embedding work and index size for every combination of settings.
+    Text is extracted once; combinations where the child size is not below the
+    parent size, or the overlap is not below the child size, are skipped.
+
+    Returns:
+        DataFrame: One row per setting, fewest vectors first
+    """
+    documents = [document_tokens(path, tokenize) for path in pdf_paths]
+    rows = []
+    for parent, child, overlap in itertools.product(parent_sizes, child_sizes, overlaps):
+        if child >= parent or overlap >= child:
+            continue
+        configuration = hierarchical_chunking_configuration(parent, child, overlap)
+        rows.append({'parent_max_tokens': parent, 'child_max_tokens': child, 'overlap_tokens': overlap,
+                     **_summarize(documents, configuration, dimensions)})
+    return pd.DataFrame(rows).sort_values(['child_chunks', 'parent_chunks']).reset_index(drop=True)
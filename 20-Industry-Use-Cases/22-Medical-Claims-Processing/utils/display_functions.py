@@ -1,3 +1,5 @@
+import html
+import threading
 import ipywidgets as widgets
 from IPython.display import display
 import boto3
@@ -15,10 +17,64 @@ def get_view(data, display_function=None):
             display(data)
     return out
 
-def display_multiple(views, view_titles = None):
-    main_tab = widgets.Tab()
-    for i, view in enumerate(views):
-        main_tab.children = (*main_tab.children, view)
-        tab_title = view_titles[i] if view_titles and view_titles[i] else f'Document {i}'
-        main_tab.set_title(i, title=tab_title)
-    display(main_tab)
\ No newline at end of file
+def _as_widget(content):
+    if isinstance(content, widgets.Widget):
+        return content
+    out = widgets.Output()
+    out.append_display_data(content)
+    return out
+
+def lazy_tabs(factories, titles=None, prefetch=False, layout=None):
+    """
+    Tab container that builds each tab's content the first time it is selected.
+
+    Args:
+        factories (list): Callables returning the tab content (a widget or displayable)
+        titles (list): Tab titles
+        prefetch (bool): Build the next tab in a background thread after a tab is shown
+        layout (widgets.Layout): Layout for the Tab widget
+
+    Returns:
+        widgets.Tab
+    """
+    placeholders = [widgets.Box() for _ in factories]
+    tab = widgets.Tab(children=placeholders, **({'layout': layout} if layout else {}))
+    for i, title in enumerate(titles or []):
+        tab.set_title(i, title)
+    built = [False] * len(factories)
+    building = set()
+    lock = threading.Lock()
+
+    def materialize(index):
+        with lock:
+            if built[index] or index in building:
+                return
+            building.add(index)
+        try:
+            placeholders[index].children = (_as_widget(factories[index]()),)
+            built[index] = True
+        except Exception as e:
+            # Show the error in the tab; selecting it again retries
+            placeholders[index].children = (widgets.HTML(f'<pre>Could not build this tab: {html.escape(repr(e))}</pre>'),)
+        finally:
+            with lock:
+                building.discard(index)
+
+    def on_select(change):
+        index = change['new']
+        if index is None:
+            return
+        materialize(index)
+        if prefetch and index + 1 < len(factories):
+            threading.Thread(target=materialize, args=(index + 1,), daemon=True).start()
+
+    tab.observe(on_select, names='selected_index')
+    if factories:
+        on_select({'new': tab.selected_index or 0})
+    return tab
+
+def display_multiple(views, view_titles = None, prefetch=False):
+    # Views may be widgets or callables that build the view; callables run only when their tab is opened
+    factories = [view if callable(view) else (lambda view=view: view) for view in views]
+    titles = [view_titles[i] if view_titles and view_titles[i] else f'Document {i}' for i in range(len(views))]
+    display(lazy_tabs(factories, titles, prefetch=prefetch))
\ No newline at end of file
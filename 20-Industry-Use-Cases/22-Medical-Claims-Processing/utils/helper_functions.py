@@ -4,8 +4,7 @@ import boto3
 from urllib.parse import urlparse
 import requests
 import base64
-import io
-from PIL import Image
+import itertools
 from PyPDF2 import PdfReader, PdfWriter
 from botocore.exceptions import ClientError
 from IPython.display import HTML
@@ -16,6 +15,8 @@ import json
 import ipywidgets as widgets
 import html
 import pandas as pd
+from .image_encoding import DEFAULT_QUALITY, encode_image, css_width_px, mime_type
+from .blueprint_registry import get_blueprint_registry
 
 s3_client = boto3.client("s3")
 bda_client = boto3.client('bedrock-data-automation')
@@ -64,58 +65,126 @@ def get_stack_output(stack_name, output_key):
     return next((o['OutputValue'] for o in stack['Outputs'] if o['OutputKey'] == output_key), None) if stack else None
 
 
-def pil_to_bytes(image):
-    byte_arr = io.BytesIO()
-    image.save(byte_arr, format='PNG')
-    return byte_arr.getvalue()
+def pil_to_bytes(image, format='PNG', quality=DEFAULT_QUALITY, max_width=None):
+    return encode_image(image, format=format, quality=quality, max_width=max_width)[0]
 
 
 def display_image(image):
-    image_widget = widgets.Image(value=pil_to_bytes(image), format='png')
+    # Shown at 400px, so encode a 2x JPEG instead of a full-size PNG
+    image_widget = widgets.Image(value=pil_to_bytes(image, format='JPEG', max_width=800), format='jpeg')
     image_widget.layout.width = '400px'
     image_widget.layout.height = 'auto'
     image_widget.layout.object_fit = 'contain'
     return image_widget
 
-def json_to_html(json_obj, indent=0):
-    result = []
-    if isinstance(json_obj, dict):
-        result.append('<table class="json-object">')
-        for key, value in json_obj.items():
-            result.append('<tr>')
-            result.append(f'<td class="key">{key}</td>')
-            result.append('<td class="value">')
-            result.append(json_to_html(value, indent + 1))
-            result.append('</td>')
-            result.append('</tr>')
-        result.append('</table>')
-    elif isinstance(json_obj, list):
-        result.append('<table class="json-array">')
-        for i, item in enumerate(json_obj):
-            result.append('<tr>')
-            result.append(f'<td class="key">{i}</td>')
-            result.append('<td class="value">')
-            result.append(json_to_html(item, indent + 1))
-            result.append('</td>')
-            result.append('</tr>')
-        result.append('</table>')
-    elif isinstance(json_obj, (str, int, float, bool)) or json_obj is None:
-        if isinstance(json_obj, str):
-            result.append(f'<span class="string">"{json_obj}"</span>')
-        elif isinstance(json_obj, bool):
-            result.append(f'<span class="boolean">{str(json_obj).lower()}</span>')
-        elif json_obj is None:
-            result.append('<span class="null">null</span>')
+JSON_HTML_MAX_NODES = 2000
+JSON_HTML_MAX_DEPTH = 8
+
+
+def _json_path_str(path):
+    return '$' + ''.join(f'[{p}]' if isinstance(p, int) else f'.{p}' for p in path)
+
+
+def _json_placeholder(path, start, label):
+    return (f'<span class="collapsed" data-path="{html.escape(_json_path_str(path))}" data-start="{start}">'
+            f'{html.escape(label)}</span>')
+
+
+def _json_scalar_html(value):
+    if isinstance(value, str):
+        return f'<span class="string">"{html.escape(value)}"</span>'
+    if isinstance(value, bool):
+        return f'<span class="boolean">{str(value).lower()}</span>'
+    if value is None:
+        return '<span class="null">null</span>'
+    return f'<span class="number">{html.escape(str(value))}</span>'
+
+
+def render_json_html(json_obj, max_nodes=JSON_HTML_MAX_NODES, max_depth=JSON_HTML_MAX_DEPTH, path=(), start=0):
+    """
+    Render JSON as nested HTML tables without recursion, into a single buffer.
+
+    Keys and values are escaped. At most `max_nodes` entries and `max_depth` levels
+    are rendered; anything beyond is emitted as a collapsed placeholder and reported
+    so it can be expanded on demand with `expand_json_html`.
+
+    Returns:
+        tuple: (html, collapsed) where collapsed is a list of (path, start) pairs
+    """
+    if not isinstance(json_obj, (dict, list)):
+        return _json_scalar_html(json_obj), []
+
+    out = []
+    collapsed = []
+    budget = max_nodes
+
+    def open_container(value, node_path, offset):
+        if isinstance(value, dict):
+            out.append('<table class="json-object">')
+            entries = itertools.islice(value.items(), offset, None)
         else:
-            result.append(f'<span class="number">{json_obj}</span>')
-    return ''.join(result)
-    
-def display_json(json_data, title):
+            out.append('<table class="json-array">')
+            entries = enumerate(itertools.islice(value, offset, None), offset)
+        # Frame: [entry iterator, path, size, next position]
+        return [entries, tuple(node_path), len(value), offset]
+
+    stack = [open_container(json_obj, path, start)]
+    while stack:
+        frame = stack[-1]
+        entry = next(frame[0], None) if budget > 0 else None
+        if entry is None:
+            _, node_path, size, position = frame
+            if position < size:
+                collapsed.append((node_path, position))
+                out.append('<tr><td class="key"></td><td class="value">')
+                out.append(_json_placeholder(node_path, position, f'… {size - position} more'))
+                out.append('</td></tr>')
+            out.append('</table>')
+            stack.pop()
+            if stack:
+                out.append('</td></tr>')
+            continue
+
+        key, child = entry
+        frame[3] += 1
+        budget -= 1
+        out.append(f'<tr><td class="key">{html.escape(str(key))}</td><td class="value">')
+        if not isinstance(child, (dict, list)):
+            out.append(_json_scalar_html(child))
+            out.append('</td></tr>')
+        elif child and len(stack) >= max_depth:
+            child_path = frame[1] + (key,)
+            label = f'{{…}} {len(child)} keys' if isinstance(child, dict) else f'[…] {len(child)} items'
+            collapsed.append((child_path, 0))
+            out.append(_json_placeholder(child_path, 0, label))
+            out.append('</td></tr>')
+        else:
+            stack.append(open_container(child, frame[1] + (key,), 0))
+    return ''.join(out), collapsed
+
+
+def get_json_path(json_obj, path):
+    for key in path:
+        json_obj = json_obj[key]
+    return json_obj
+
+
+def expand_json_html(json_obj, path, start=0, max_nodes=JSON_HTML_MAX_NODES, max_depth=JSON_HTML_MAX_DEPTH):
+    """Render a collapsed placeholder reported by `render_json_html`."""
+    return render_json_html(get_json_path(json_obj, path), max_nodes=max_nodes, max_depth=max_depth,
+                            path=path, start=start)
+
+
+def json_to_html(json_obj, indent=0, max_nodes=JSON_HTML_MAX_NODES, max_depth=JSON_HTML_MAX_DEPTH):
+    return render_json_html(json_obj, max_nodes=max_nodes, max_depth=max_depth)[0]
+
+def display_json(json_data, title, max_nodes=JSON_HTML_MAX_NODES, max_depth=JSON_HTML_MAX_DEPTH):
+    json_html, collapsed = render_json_html(json_data, max_nodes=max_nodes, max_depth=max_depth)
     html_content = f"""
     <div class="json-container">
-        <h3 class="json-title">{title}</h3>
+        <h3 class="json-title">{html.escape(str(title))}</h3>
         <div class="json-viewer">
-            {json_to_html(json_data)}
+            {json_html}
         </div>
     </div>
     <style>
@@ -156,9 +225,32 @@ def display_json(json_data, title):
         .number {{ color: #116644; }}
         .boolean {{ color: #ff8c00; }}
         .null {{ color: #808080; }}
+        .collapsed {{ color: #808080; font-style: italic; }}
     </style>
     """
-    return widgets.HTML(html_content)
+    if not collapsed:
+        return widgets.HTML(html_content)
+
+    # Collapsed nodes are rendered only when the user asks for them
+    def option(path, start):
+        return (f'{_json_path_str(path)}' + (f' (from {start})' if start else ''), (path, start))
+
+    selector = widgets.Dropdown(options=[option(*c) for c in collapsed], description='Collapsed:')
+    expand_button = widgets.Button(description='Expand')
+    expanded = widgets.VBox([])
+
+    def on_expand(_):
+        if selector.value is None:
+            return
+        path, start = selector.value
+        sub_html, sub_collapsed = expand_json_html(json_data, path, start, max_nodes=max_nodes, max_depth=max_depth)
+        expanded.children = (*expanded.children, widgets.HTML(
+            f'<div class="json-viewer"><b>{html.escape(_json_path_str(path))}</b>{sub_html}</div>'))
+        remaining = [o for o in selector.options if o[1] != (path, start)]
+        selector.options = remaining + [option(*c) for c in sub_collapsed]
+
+    expand_button.on_click(on_expand)
+    return widgets.VBox([widgets.HTML(html_content), widgets.HBox([selector, expand_button]), expanded])
 
 def display_image_jsons(image, json_arr, titles):
     image_widget = display_image(image)
@@ -218,42 +310,137 @@ def read_s3_object(s3_uri):
         print(f"Error reading S3 object: {e}")
         return None
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class IncompleteDownloadError(IOError):
+    pass
+
+
+def _range_validator(response):
+    """Strong ETag or Last-Modified of a response, usable in an If-Range header."""
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response.headers.get('Last-Modified')
+
+
+def stream_download(url, file_path, chunk_size=DOWNLOAD_CHUNK_SIZE, max_retries=3, timeout=30):
+    """
+    Stream a URL to a file in chunks, resuming with an HTTP Range request when the
+    connection drops or a partial file is left over from an earlier attempt.
+
+    The ETag (or Last-Modified) of the download is kept in `<file_path>.validator`
+    and sent as If-Range when resuming, so a remote file that changed since the
+    partial download is downloaded again instead of appended to the stale prefix.
+
+    Args:
+        url (str): Document URL
+        file_path (str): Destination file; existing content is treated as a partial download
+        chunk_size (int): Bytes read per chunk
+        max_retries (int): Resume attempts before giving up
+        timeout (int): Connect/read timeout in seconds
+
+    Returns:
+        int: Size of the downloaded file in bytes
+    """
+    validator_path = f"{file_path}.validator"
+    validator = None
+    if os.path.exists(validator_path):
+        with open(validator_path) as f:
+            validator = f.read().strip() or None
+    # Without a validator a leftover partial file cannot be checked, so it is not resumed
+    downloaded = os.path.getsize(file_path) if os.path.exists(file_path) and validator else 0
+    start_time = time.time()
+    resumed_from = downloaded
+    attempts = 0
+    while True:
+        headers = {'Range': f'bytes={downloaded}-', 'If-Range': validator} if downloaded else {}
+        try:
+            with requests.get(url, headers=headers, stream=True, timeout=timeout) as response: # nosemgrep
+                if response.status_code == 416:
+                    # Range starts at the end of the unchanged file: the partial download was complete
+                    break
+                response.raise_for_status()
+                if downloaded and response.status_code != 206:
+                    print("Remote file changed or range requests are not supported, restarting download")
+                    downloaded = resumed_from = 0
+                if not downloaded:
+                    validator = _range_validator(response)
+                    if validator:
+                        with open(validator_path, 'w') as f:
+                            f.write(validator)
+                    elif os.path.exists(validator_path):
+                        os.remove(validator_path)
+                expected = response.headers.get('Content-Length')
+                expected = downloaded + int(expected) if expected else None
+                with open(file_path, 'ab' if downloaded else 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        downloaded += len(chunk)
+            if expected is not None and downloaded < expected:
+                raise IncompleteDownloadError(f"Received {downloaded} of {expected} bytes")
+            break
+        except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout, IncompleteDownloadError) as e:
+            attempts += 1
+            if attempts > max_retries:
+                raise
+            print(f"Download interrupted at {downloaded} bytes ({e}), resuming ({attempts}/{max_retries})")
+            if not validator:
+                print("No ETag or Last-Modified to check the partial download against, restarting")
+                downloaded = resumed_from = 0
+
+    if os.path.exists(validator_path):
+        os.remove(validator_path)
+    elapsed = max(time.time() - start_time, 1e-6)
+    transferred_mb = (downloaded - resumed_from) / (1024 * 1024)
+    print(f"Downloaded {transferred_mb:.1f} MB in {elapsed:.1f}s ({transferred_mb / elapsed:.1f} MB/s)")
+    return downloaded
+
+
 def download_document(url, start_page_index=None, end_page_index=None, output_file_path=None):
 
     if not output_file_path:
         filename = os.path.basename(url)
         output_file_path = filename
-        
-    # Download the PDF
-    response = requests.get(url, timeout=30) # nosemgrep
-    print(response)
-    pdf_content = io.BytesIO(response.content)
-    
-    # Create a PDF reader object
-    pdf_reader = PdfReader(pdf_content)
-    
-    # Create a PDF writer object
-    pdf_writer = PdfWriter()
-    
-    start_page_index = 0 if not start_page_index else max(start_page_index,0)
-    end_page_index = len(pdf_reader.pages)-1 if not end_page_index else min(end_page_index,len(pdf_reader.pages)-1)
 
-    # Specify the pages you want to extract (0-indexed)
-    pages_to_extract = list(range(start_page_index, end_page_index))
-    
-    # Add the specified pages to the writer
-    for page_num in pages_to_extract:
-        page = pdf_reader.pages[page_num]
-        pdf_writer.add_page(page)
+    # Stream the PDF to a partial file next to the output, so an interrupted download can resume
+    partial_file_path = f"{output_file_path}.part"
+    stream_download(url, partial_file_path)
+
+    # Pass an open file so PdfReader reads objects from disk instead of loading the whole file
+    with open(partial_file_path, "rb") as pdf_file:
+        pdf_reader = PdfReader(pdf_file)
+        page_count = len(pdf_reader.pages)
+
+        start_page_index = 0 if not start_page_index else max(start_page_index,0)
+        end_page_index = page_count-1 if end_page_index is None else min(end_page_index,page_count-1)
+
+        # Specify the pages you want to extract (0-indexed, inclusive)
+        pages_to_extract = list(range(start_page_index, end_page_index + 1))
+
+        if len(pages_to_extract) < page_count:
+            # Create a PDF writer object and add the specified pages
+            pdf_writer = PdfWriter()
+            for page_num in pages_to_extract:
+                pdf_writer.add_page(pdf_reader.pages[page_num])
+
+            # Save the extracted pages to a new PDF
+            with open(output_file_path, "wb") as output_file:
+                pdf_writer.write(output_file)
+
+    if len(pages_to_extract) < page_count:
+        os.remove(partial_file_path)
+    else:
+        # All pages requested: keep the downloaded file as-is
+        os.replace(partial_file_path, output_file_path)
 
     print(f"Created file: {output_file_path}")
-    # Save the extracted pages to a new PDF
-    with open(output_file_path, "wb") as output_file:
-        pdf_writer.write(output_file)
     return output_file_path
 
 
-def create_image_html_column(row: pd.Series, image_col: str, width: str = '300px') -> str:
+def create_image_html_column(row: pd.Series, image_col: str, width: str = '300px', format: str = None, quality: int = DEFAULT_QUALITY) -> str:
     """
     Create HTML embedded image from S3 URI by downloading and base64 encoding the image for a DataFrame row.
     
@@ -261,6 +448,8 @@ def create_image_html_column(row: pd.Series, image_col: str, width: str = '300px
         row (pd.Series): DataFrame row
         image_col (str): Name of column containing S3 URI
         width (str): Fixed width for image
+        format (str): Output format ('JPEG', 'WEBP', 'PNG'); None passes the original bytes through when possible
+        quality (int): Quality for JPEG/WEBP
         
     Returns:
         str: HTML string for embedded image
@@ -283,22 +472,16 @@ def create_image_html_column(row: pd.Series, image_col: str, width: str = '300px
         response = s3_client.get_object(Bucket=bucket_name, Key=object_key)
         image_content = response['Body'].read()
         
-        # Open image using PIL
-        image = Image.open(io.BytesIO(image_content))
-        
-        # Convert image to RGB if it's in RGBA mode
-        if image.mode == 'RGBA':
-            image = image.convert('RGB')
-        
-        # Save image to bytes
-        buffered = io.BytesIO()
-        image.save(buffered, format="JPEG")
+        # Re-encode only if the image is larger than twice the display width or the format changes
+        max_width = css_width_px(width)
+        image_bytes, image_format = encode_image(image_content, format=format, quality=quality,
+                                                 max_width=max_width * 2 if max_width else None)
         
         # Encode image to base64
-        img_str = base64.b64encode(buffered.getvalue()).decode()
+        img_str = base64.b64encode(image_bytes).decode()
         
         # Create HTML string with base64 encoded image
-        return f'<img src="data:image/jpeg;base64,{img_str}" style="width: {width}; object-fit: contain;">'
+        return f'<img src="data:{mime_type(image_format)};base64,{img_str}" style="width: {width}; object-fit: contain;">'
     except Exception as e:
         print(f"Error processing image {s3_uri}: {str(e)}")
         return ''
@@ -460,31 +643,10 @@ def get_s3_to_dict(s3_url):
     return json_obj
 
 def create_or_update_blueprint(bda_client, blueprint_name, blueprint_description, blueprint_type, blueprint_stage, blueprint_schema):
-    list_blueprints_response = bda_client.list_blueprints(
-        blueprintStageFilter='ALL'
-    )
-    blueprint = next((blueprint for blueprint in
-                      list_blueprints_response['blueprints']
-                      if 'blueprintName' in blueprint and
-                      blueprint['blueprintName'] == blueprint_name), None)
-    response = None
-    if not blueprint:
-        print(f'No existing blueprint found with name={blueprint_name}, creating custom blueprint')
-        response = bda_client.create_blueprint(
-            blueprintName=blueprint_name,
-            type=blueprint_type,
-            blueprintStage=blueprint_stage,
-            schema=json.dumps(blueprint_schema)
-        )
-    else:
-        print(f'Found existing blueprint with name={blueprint_name}, updating Stage and Schema')
-        response = bda_client.update_blueprint(
-            blueprintArn=blueprint['blueprintArn'],
-            blueprintStage=blueprint_stage,
-            schema=json.dumps(blueprint_schema)
-        )
-
-    return response['blueprint']['blueprintArn']
+    # One paginated listing is shared across calls; unchanged blueprints are not updated
+    registry = get_blueprint_registry(bda_client)
+    blueprint_arn, _ = registry.create_or_update(blueprint_name, blueprint_type, blueprint_stage, blueprint_schema)
+    return blueprint_arn
 
 
 def transform_custom_output(input_json, explainability_info):
@@ -0,0 +1,153 @@
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+
+DEFAULT_FORMAT = 'JPEG'
+DEFAULT_QUALITY = 80
+DEFAULT_WORKERS = 8
+
+# Formats every notebook front end can show as-is, so their bytes can be passed through
+PASSTHROUGH_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+
+MIME_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'WEBP': 'image/webp', 'GIF': 'image/gif'}
+
+
+def _open(source):
+    if isinstance(source, Image.Image):
+        return source, None
+    if isinstance(source, (bytes, bytearray)):
+        image = Image.open(io.BytesIO(source))
+        return image, bytes(source)
+    raise TypeError(f'Expected PIL image or bytes, got {type(source).__name__}')
+
+
+def _target_size(size, max_width=None, max_height=None):
+    width, height = size
+    scale = 1.0
+    if max_width and width > max_width:
+        scale = min(scale, max_width / width)
+    if max_height and height > max_height:
+        scale = min(scale, max_height / height)
+    if scale == 1.0:
+        return None
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def encode_image(source, format=None, quality=DEFAULT_QUALITY, max_width=None, max_height=None):
+    """
+    Encode an image for display, skipping work that is not needed.
+
+    Encoded bytes are passed through unchanged when they are already in a displayable
+    format (and in `format`, if one is given) and no resize is needed. Otherwise the
+    image is resized first, so the encoder only sees the pixels that will be shown.
+
+    Args:
+        source (PIL.Image or bytes): Image or encoded image bytes
+        format (str): Output format ('JPEG', 'WEBP', 'PNG'); None keeps the source format
+            when it is displayable and uses JPEG otherwise
+        quality (int): Quality for lossy formats
+        max_width (int): Downscale to at most this width in pixels
+        max_height (int): Downscale to at most this height in pixels
+
+    Returns:
+        tuple: (encoded bytes, format name)
+    """
+    image, original = _open(source)
+    format = format.upper() if format else None
+    source_format = (image.format or '').upper()
+    size = _target_size(image.size, max_width, max_height)
+
+    if original is not None and size is None and source_format in PASSTHROUGH_FORMATS \
+            and format in (None, source_format):
+        return original, source_format
+
+    format = format or (source_format if source_format in PASSTHROUGH_FORMATS else DEFAULT_FORMAT)
+    if size:
+        if original is not None:
+            # Let the JPEG decoder scale down by a power of two while decoding
+            image.draft(image.mode, size)
+        image = image.resize(size, Image.LANCZOS, reducing_gap=2.0)
+    if format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    options = {}
+    if format in ('JPEG', 'WEBP'):
+        options['quality'] = quality
+    if format == 'WEBP':
+        options['method'] = 4
+    if format == 'PNG':
+        options['compress_level'] = 1
+
+    buffered = io.BytesIO()
+    image.save(buffered, format=format, **options)
+    return buffered.getvalue(), format
+
+
+def encode_images(sources, workers=DEFAULT_WORKERS, **kwargs):
+    """
+    Encode many images in a thread pool (Pillow releases the GIL while encoding).
+
+    Args:
+        sources (list): PIL images or encoded image bytes
+        workers (int): Number of threads
+        **kwargs: Passed to `encode_image`
+
+    Returns:
+        list: (encoded bytes, format name) tuples in the order of `sources`
+    """
+    sources = list(sources)
+    if workers <= 1 or len(sources) <= 1:
+        return [encode_image(source, **kwargs) for source in sources]
+    with ThreadPoolExecutor(max_workers=min(workers, len(sources))) as executor:
+        return list(executor.map(lambda source: encode_image(source, **kwargs), sources))
+
+
+def mime_type(format):
+    return MIME_TYPES.get(format.upper(), 'application/octet-stream')
+
+
+def css_width_px(width):
+    """Pixel width from a CSS width such as '300px'; None for relative widths."""
+    if isinstance(width, (int, float)):
+        return int(width)
+    if isinstance(width, str) and width.strip().endswith('px'):
+        return int(float(width.strip()[:-2]))
+    return None
+
+
+def benchmark_encoding(sources, settings=None, workers=DEFAULT_WORKERS):
+    """
+    Compare encoding settings on a batch of images.
+
+    Args:
+        sources (list): PIL images or encoded image bytes
+        settings (dict): name -> `encode_image` keyword arguments
+        workers (int): Threads used for each batch
+
+    Returns:
+        list: One dict per setting with bytes and milliseconds per image
+    """
+    sources = list(sources)
+    settings = settings or {
+        'png (full size)': {'format': 'PNG'},
+        'jpeg q80': {'format': 'JPEG', 'quality': 80},
+        'webp q80': {'format': 'WEBP', 'quality': 80},
+        'jpeg q80, 800px': {'format': 'JPEG', 'quality': 80, 'max_width': 800},
+        'webp q80, 800px': {'format': 'WEBP', 'quality': 80, 'max_width': 800},
+        'passthrough': {}
+    }
+    results = []
+    for name, options in settings.items():
+        start = time.perf_counter()
+        encoded = encode_images(sources, workers=workers, **options)
+        elapsed = time.perf_counter() - start
+        results.append({
+            'setting': name,
+            'images': len(encoded),
+            'bytes_per_image': sum(len(data) for data, _ in encoded) / max(len(encoded), 1),
+            'ms_per_image': elapsed * 1000 / max(len(encoded), 1)
+        })
+    return results
@@ -7,10 +7,12 @@ from smart_open import open
 from aws_lambda_powertools import Logger
 from aws_lambda_powertools.utilities.typing import LambdaContext
 from botocore.config import Config
+from prompt_builder import build_prompt
 
 
 AGENT_RUNTIME_ARN = os.environ["AGENT_RUNTIME_ARN"]
 AGENT_ENDPOINT_NAME = os.environ["AGENT_ENDPOINT_NAME"]
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "100000"))
 
 logger = Logger(service="agentcore-service")
 
@@ -102,7 +104,7 @@ def get_bedrock_data_automation_results(job_metadata: dict) -> str:
                 json_string = json.load(f)
                 document_class = json_string["document_class"]["type"]
                 inference_result = json_string["inference_result"]
-                inference_results.append({ document_class: inference_result})
+                inference_results.append({"key": document_class, "value": inference_result, "document_class": document_class})
         elif custom_output_status == "NO_MATCH":
             standard_output_path = segment["standard_output_path"]
             with open(standard_output_path) as f:
@@ -111,5 +113,9 @@ def get_bedrock_data_automation_results(job_metadata: dict) -> str:
                 for page in pages:
                     page_index = page["page_index"]
                     inference_result = page["representation"]["markdown"]
-                    inference_results.append({f"page-{page_index}": inference_result })
-    return json.dumps(inference_results)
\ No newline at end of file
+                    inference_results.append({"key": f"page-{page_index}", "value": inference_result})
+    return build_prompt(
+        inference_results,
+        token_budget=PROMPT_TOKEN_BUDGET,
+        job_id=job_metadata.get("job_id"),
+    )
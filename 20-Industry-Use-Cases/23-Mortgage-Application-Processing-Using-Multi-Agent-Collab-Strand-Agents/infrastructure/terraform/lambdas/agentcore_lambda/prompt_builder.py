@@ -0,0 +1,193 @@
+import hashlib
+import json
+import math
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from aws_lambda_powertools import Logger
+
+
+logger = Logger(service="agentcore-service", child=True)
+
+# Average characters per token for Claude models on English/markdown text.
+CHARS_PER_TOKEN = 4.0
+
+# Document classes in the order they matter to the extraction agent. Matching is
+# case-insensitive on alphanumerics, so "W2" also matches "W-2 Form".
+DEFAULT_CLASS_PRIORITY = [
+    "Complete Mortgage Loan Application",
+    "Mortgage Underwriter Notes",
+    "W2",
+    "Payslip",
+    "Bank Statement",
+    "Driver License",
+    "Check",
+]
+
+MARKDOWN_BOILERPLATE = [
+    re.compile(r"!\[[^\]]*\]\([^)]*\)"),                        # embedded images
+    re.compile(r"<!--.*?-->", re.DOTALL),                        # html comments
+    re.compile(r"^\s*page\s+\d+(\s+of\s+\d+)?\s*$", re.I | re.M),  # page footers
+    re.compile(r"^\s*([-*_=]\s*){3,}$", re.M),                   # horizontal rules
+    re.compile(r"^\s*\|?(\s*:?-{3,}:?\s*\|)+\s*:?-*:?\s*$", re.M),  # table header rules
+]
+
+
+def estimate_tokens(text: str, chars_per_token: float = CHARS_PER_TOKEN) -> int:
+    return math.ceil(len(text) / chars_per_token) if text else 0
+
+
+def prune_empty(value: Any) -> Any:
+    """Recursively drop None, empty strings and empty containers."""
+    if isinstance(value, dict):
+        pruned = {k: prune_empty(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if not _is_empty(v)}
+    if isinstance(value, list):
+        pruned = [prune_empty(v) for v in value]
+        return [v for v in pruned if not _is_empty(v)]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def clean_markdown(markdown: str) -> str:
+    for pattern in MARKDOWN_BOILERPLATE:
+        markdown = pattern.sub("", markdown)
+    markdown = re.sub(r"[ \t]+\n", "\n", markdown)
+    markdown = re.sub(r"\n{3,}", "\n\n", markdown)
+    return markdown.strip()
+
+
+def class_priority(document_class: Optional[str], priority: Sequence[str]) -> int:
+    """Rank of a document class in `priority`; unknown classes and raw pages come last."""
+    if document_class:
+        normalized = _normalize(document_class)
+        for rank, name in enumerate(priority):
+            if _normalize(name) in normalized:
+                return rank
+    return len(priority)
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+def _content_hash(value: Any) -> str:
+    if isinstance(value, str):
+        payload = re.sub(r"\s+", " ", value).strip().lower()
+    else:
+        payload = json.dumps(value, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _serialize(key: str, value: Any) -> str:
+    return json.dumps({key: value}, separators=(",", ":"))
+
+
+def _piece_tokens(key: str, value: Any) -> int:
+    # Includes the comma that separates the piece from the next one in the prompt list
+    return estimate_tokens(_serialize(key, value) + ",")
+
+
+def _truncate_to_fit(key: str, value: str, max_tokens: int) -> Optional[str]:
+    """Longest prefix of `value` whose serialized piece, JSON escaping included, fits `max_tokens`."""
+    low, high = 0, min(len(value), int(max_tokens * CHARS_PER_TOKEN))
+    if _piece_tokens(key, value[:low]) > max_tokens:
+        return None
+    # The serialized length only grows with the prefix, so the longest fitting prefix can be bisected
+    while low < high:
+        middle = (low + high + 1) // 2
+        if _piece_tokens(key, value[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    return value[:low] if low else None
+
+
+def build_prompt(
+    pieces: List[Dict[str, Any]],
+    token_budget: int,
+    class_priority_order: Sequence[str] = DEFAULT_CLASS_PRIORITY,
+    job_id: Optional[str] = None,
+) -> str:
+    """
+    Build the extraction agent prompt from BDA results within a token budget.
+
+    Each piece is a dict with `key` (document class or `page-<n>`), `value` (the
+    `inference_result` or page markdown) and optional `document_class`. Pieces are
+    cleaned, de-duplicated and then admitted in priority order until the budget is
+    spent; markdown that only partly fits is truncated. Admitted pieces keep their
+    original order in the output.
+
+    Args:
+        pieces: Results in document order
+        token_budget: Maximum estimated tokens for the serialized prompt
+        class_priority_order: Document classes from most to least important
+        job_id: BDA job id, used for logging
+
+    Returns:
+        JSON string with a list of `{key: value}` objects
+    """
+    tokens_before = sum(estimate_tokens(json.dumps({p["key"]: p["value"]})) for p in pieces)
+
+    seen = set()
+    candidates = []
+    duplicates = 0
+    for order, piece in enumerate(pieces):
+        value = piece["value"]
+        value = clean_markdown(value) if isinstance(value, str) else prune_empty(value)
+        if _is_empty(value):
+            continue
+        digest = _content_hash(value)
+        if digest in seen:
+            duplicates += 1
+            continue
+        seen.add(digest)
+        candidates.append({
+            "order": order,
+            "key": piece["key"],
+            "value": value,
+            "tokens": _piece_tokens(piece["key"], value),
+            "rank": class_priority(piece.get("document_class"), class_priority_order),
+        })
+
+    # The list brackets are reserved up front; each piece's tokens include its separator
+    remaining = token_budget - estimate_tokens("[]")
+    selected = []
+    dropped = []
+    for candidate in sorted(candidates, key=lambda c: (c["rank"], c["order"])):
+        if candidate["tokens"] <= remaining:
+            selected.append(candidate)
+            remaining -= candidate["tokens"]
+        elif isinstance(candidate["value"], str) and remaining > 0:
+            truncated = _truncate_to_fit(candidate["key"], candidate["value"], remaining)
+            if truncated:
+                candidate["value"] = truncated
+                candidate["tokens"] = _piece_tokens(candidate["key"], truncated)
+                selected.append(candidate)
+                remaining -= candidate["tokens"]
+            else:
+                dropped.append(candidate["key"])
+        else:
+            dropped.append(candidate["key"])
+
+    selected.sort(key=lambda c: c["order"])
+    prompt = json.dumps([{c["key"]: c["value"]} for c in selected], separators=(",", ":"))
+
+    logger.info(
+        "Built extraction prompt",
+        extra={
+            "job_id": job_id,
+            "pieces": len(pieces),
+            "duplicates_removed": duplicates,
+            "dropped": dropped,
+            "tokens_before": tokens_before,
+            "tokens_after": estimate_tokens(prompt),
+            "token_budget": token_budget,
+        },
+    )
+    return prompt
@@ -364,6 +364,7 @@ module "mortgage_applications_agentcore_lambda" {
   environment_variables = {
     AGENT_RUNTIME_ARN = "arn:aws:bedrock-agentcore:us-east-1:145023138732:runtime/src_mortgage_processor_main-SSl11IF66g"
     AGENT_ENDPOINT_NAME = "DEFAULT"
+    PROMPT_TOKEN_BUDGET = "100000"
   }
 
   attach_policy_statements = true
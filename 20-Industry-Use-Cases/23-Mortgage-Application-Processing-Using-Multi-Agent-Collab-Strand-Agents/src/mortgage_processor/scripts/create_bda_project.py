@@ -1,108 +1,251 @@
-from typing import List
-import boto3
+"""
+Sync the Bedrock Data Automation blueprints and project described in bda_manifest.yaml.
+
+    python create_bda_project.py              # show the plan only
+    python create_bda_project.py --apply      # apply the changes
+
+The manifest is diffed against the service (one paginated listing per resource
+type, schema reads in parallel) and only the blueprints and project that differ
+are created or updated, with bounded parallelism.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import boto3
+import yaml
+from botocore.config import Config
+
+from mortgage_processor.scripts.output_profiles import OUTPUT_PROFILES, standard_output_configuration
+
+DEFAULT_MANIFEST = Path(__file__).parent / "bda_manifest.yaml"
+DEFAULT_MAX_WORKERS = 4
+PUBLIC_BLUEPRINT_ARN = "arn:aws:bedrock:{region}:aws:blueprint/bedrock-data-automation-public-{name}"
+PROJECT_CONFIG_KEYS = ("standardOutputConfiguration", "overrideConfiguration", "customOutputConfiguration")
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(message)s")
+
+
+@dataclass
+class Change:
+    kind: str
+    name: str
+    action: str
+    reason: str = ""
+    arn: Optional[str] = None
+    seconds: float = 0.0
+    error: Optional[str] = None
+    desired: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+
+def canonical_hash(value: Any) -> str:
+    if isinstance(value, str):
+        value = json.loads(value)
+    return hashlib.sha256(json.dumps(value, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def is_subset(desired: Any, deployed: Any) -> bool:
+    """True when every value set in `desired` is also set in `deployed`; service defaults are ignored."""
+    if isinstance(desired, dict):
+        return isinstance(deployed, dict) and all(is_subset(v, deployed.get(k)) for k, v in desired.items())
+    if isinstance(desired, list) and desired and isinstance(desired[0], dict):
+        return isinstance(deployed, list) and len(desired) == len(deployed) and all(
+            is_subset(d, s) for d, s in zip(desired, deployed))
+    if isinstance(desired, list):
+        return isinstance(deployed, list) and sorted(map(str, desired)) == sorted(map(str, deployed))
+    return desired == deployed
+
+
+def paginate(method, key: str, **kwargs) -> List[Dict[str, Any]]:
+    items = []
+    while True:
+        response = method(**kwargs)
+        items += response.get(key, [])
+        if not response.get("nextToken"):
+            return items
+        kwargs["nextToken"] = response["nextToken"]
+
+
+def load_manifest(path: Path, output_profile: Optional[str] = None) -> Dict[str, Any]:
+    manifest = yaml.safe_load(path.read_text(encoding="utf-8"))
+    project = manifest["project"]
+    if output_profile:
+        project["output_profile"] = output_profile
+        project.pop("standardOutputConfiguration", None)
+    if "standardOutputConfiguration" not in project and project.get("output_profile"):
+        project["standardOutputConfiguration"] = standard_output_configuration(project["output_profile"])
+    for blueprint in manifest.get("blueprints", []):
+        blueprint["schema_text"] = (path.parent / blueprint["schema"]).read_text(encoding="utf-8")
+        blueprint.setdefault("type", "DOCUMENT")
+        blueprint.setdefault("stage", "LIVE")
+    return manifest
+
 
-client = boto3.client('bedrock-data-automation', region_name='us-east-1')
-
-def create_project(blueprint_arns: List[str]):
-    try:
-        resp = client.create_data_automation_project(
-            projectName="IRLA_V2",
-            projectDescription="",
-            projectStage="LIVE",
-            standardOutputConfiguration={
-                    "document": {
-                        "extraction": {
-                            "granularity": {"types": ["PAGE", "ELEMENT"]},
-                            "boundingBox": {"state": "DISABLED"}
-                        },
-                        "generativeField": {"state": "DISABLED"},
-                        "outputFormat": {
-                            "textFormat": {"types": ["MARKDOWN"]},
-                            "additionalFileFormat": {"state": "DISABLED"}
-                        }
-                    },
-                    "image": {
-                        "extraction": {
-                            "category": {"state": "ENABLED", "types": ["TEXT_DETECTION"]},
-                            "boundingBox": {"state": "ENABLED"}
-                        },
-                        "generativeField": {"state": "ENABLED", "types": ["IMAGE_SUMMARY"]}
-                    },
-                    "video": {
-                        "extraction": {
-                            "category": {"state": "ENABLED", "types": ["TEXT_DETECTION"]},
-                            "boundingBox": {"state": "ENABLED"}
-                        },
-                        "generativeField": {
-                            "state": "ENABLED",
-                            "types": ["VIDEO_SUMMARY", "CHAPTER_SUMMARY"]
-                        }
-                    },
-                    "audio": {
-                        "extraction": {"category": {"state": "ENABLED", "types": ["TRANSCRIPT"]}},
-                        "generativeField": {"state": "DISABLED"}
-                    }
-                },
-                overrideConfiguration={
-                    "document": {
-                        "splitter": {"state": "ENABLED"},
-                        "modalityProcessing": {"state": "ENABLED"}
-                    },
-                    "image": {"modalityProcessing": {"state": "ENABLED"}},
-                    "video": {"modalityProcessing": {"state": "ENABLED"}},
-                    "audio": {"modalityProcessing": {"state": "ENABLED"}},
-                    "modalityRouting": {}
-                },
-                customOutputConfiguration={
-                    'blueprints': [{"blueprintArn": arn, 'blueprintStage': 'LIVE'} for arn in blueprint_arns]
-                },
-            )
-        project_arn = resp["projectArn"]
-        print(f"Created project: {project_arn}")
-        return project_arn
-    except client.exceptions.ConflictException:
-        print(f"Project IRLA_V2 exists")
-        return None
-
-def create_blueprints(): 
-
-    blueprints_dir = Path("blueprints")
-
-    underwriter_note_SCHEMA = (blueprints_dir / "underwriter_note_schema.json").read_text(encoding="utf-8")
-    urla_information_SCHEMA = (blueprints_dir / "urla_information_schema.json").read_text(encoding="utf-8")
-
-    blueprint_schemas = {
-        "underwriter-note": underwriter_note_SCHEMA,
-        "urla-information": urla_information_SCHEMA,
-    }
-
-    arns = []
-    for name, schema in blueprint_schemas.items():
+class BdaSync:
+    def __init__(self, manifest: Dict[str, Any], max_workers: int = DEFAULT_MAX_WORKERS):
+        self.manifest = manifest
+        self.region = manifest.get("region", "us-east-1")
+        self.max_workers = max_workers
+        self.client = boto3.client(
+            "bedrock-data-automation", region_name=self.region,
+            config=Config(retries={"max_attempts": 10, "mode": "adaptive"}, max_pool_connections=max_workers * 2))
+
+    def _blueprint_change(self, blueprint: Dict[str, Any], deployed: Optional[Dict[str, Any]]) -> Change:
+        change = Change("blueprint", blueprint["name"], "create", "not deployed", desired=blueprint)
+        if not deployed:
+            return change
+        change.arn = deployed["blueprintArn"]
+        remote = self.client.get_blueprint(blueprintArn=deployed["blueprintArn"],
+                                           blueprintStage=deployed.get("blueprintStage", "LIVE"))["blueprint"]
+        if remote.get("blueprintStage") != blueprint["stage"]:
+            change.action, change.reason = "update", f"stage {remote.get('blueprintStage')} -> {blueprint['stage']}"
+        elif canonical_hash(remote["schema"]) != canonical_hash(blueprint["schema_text"]):
+            change.action, change.reason = "update", "schema changed"
+        else:
+            change.action, change.reason = "noop", "up to date"
+        return change
+
+    def plan(self) -> List[Change]:
+        """Diff the manifest against the service."""
+        deployed = {}
+        for item in paginate(self.client.list_blueprints, "blueprints", blueprintStageFilter="ALL"):
+            if item.get("blueprintName") not in deployed or item.get("blueprintStage") == "LIVE":
+                deployed[item.get("blueprintName")] = item
+
+        blueprints = self.manifest.get("blueprints", [])
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            changes = list(executor.map(lambda b: self._blueprint_change(b, deployed.get(b["name"])), blueprints))
+
+        changes.append(self._project_change(changes))
+        return changes
+
+    def _project_config(self, blueprint_arns: List[str]) -> Dict[str, Any]:
+        project = self.manifest["project"]
+        config = {key: project[key] for key in PROJECT_CONFIG_KEYS if key in project}
+        config["customOutputConfiguration"] = {
+            "blueprints": [{"blueprintArn": arn, "blueprintStage": "LIVE"} for arn in blueprint_arns]}
+        return config
+
+    def _project_change(self, blueprint_changes: List[Change]) -> Change:
+        project = self.manifest["project"]
+        change = Change("project", project["name"], "create", "not deployed")
+        existing = next((p for p in paginate(self.client.list_data_automation_projects, "projects")
+                         if p.get("projectName") == project["name"]), None)
+        public_arns = [PUBLIC_BLUEPRINT_ARN.format(region=self.region, name=name)
+                       for name in self.manifest.get("public_blueprints", [])]
+        if not existing:
+            return change
+
+        change.arn = existing["projectArn"]
+        remote = self.client.get_data_automation_project(
+            projectArn=existing["projectArn"], projectStage=project.get("stage", "LIVE"))["project"]
+        known_arns = [c.arn for c in blueprint_changes if c.arn] + public_arns
+        desired = self._project_config(known_arns)
+        remote_arns = sorted(b["blueprintArn"] for b in remote.get("customOutputConfiguration", {}).get("blueprints", []))
+        pending = [c.name for c in blueprint_changes if c.action == "create"]
+        if pending or remote_arns != sorted(known_arns):
+            change.action, change.reason = "update", "blueprint list changed"
+        elif not all(is_subset(desired[key], remote.get(key)) for key in desired if key != "customOutputConfiguration"):
+            change.action, change.reason = "update", "output configuration changed"
+        elif project.get("description", "") != remote.get("projectDescription", ""):
+            change.action, change.reason = "update", "description changed"
+        else:
+            change.action, change.reason = "noop", "up to date"
+        return change
+
+    def _apply_blueprint(self, change: Change) -> Change:
+        blueprint = change.desired
+        start = time.time()
+        try:
+            if change.action == "create":
+                response = self.client.create_blueprint(
+                    blueprintName=blueprint["name"], type=blueprint["type"],
+                    blueprintStage=blueprint["stage"], schema=blueprint["schema_text"])
+            else:
+                response = self.client.update_blueprint(
+                    blueprintArn=change.arn, blueprintStage=blueprint["stage"], schema=blueprint["schema_text"])
+            change.arn = response["blueprint"]["blueprintArn"]
+        except Exception as e:
+            change.error = str(e)
+        change.seconds = time.time() - start
+        return change
+
+    def apply(self, changes: List[Change]) -> List[Change]:
+        """Apply blueprint changes in parallel, then create or update the project."""
+        pending = [c for c in changes if c.kind == "blueprint" and c.action != "noop"]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            list(executor.map(self._apply_blueprint, pending))
+
+        project_change = next(c for c in changes if c.kind == "project")
+        failed = [c.name for c in changes if c.error]
+        if failed:
+            project_change.error = f"skipped, blueprint changes failed: {', '.join(failed)}"
+            return changes
+        if project_change.action == "noop":
+            return changes
+
+        project = self.manifest["project"]
+        blueprint_arns = [c.arn for c in changes if c.kind == "blueprint"] + [
+            PUBLIC_BLUEPRINT_ARN.format(region=self.region, name=name) for name in self.manifest.get("public_blueprints", [])]
+        config = self._project_config(blueprint_arns)
+        start = time.time()
         try:
-            resp = client.create_blueprint(
-                blueprintName=name,
-                type="DOCUMENT",
-                schema=schema
-            )
-            arn = resp["blueprint"]["blueprintArn"]
-            print(f"Blueprint created: {name} -> {arn}")
-            arns.append(arn)
-        except client.exceptions.ConflictException:
-            print(f"Blueprint {name} exists")
-    return arns
+            if project_change.action == "create":
+                response = self.client.create_data_automation_project(
+                    projectName=project["name"], projectDescription=project.get("description", ""),
+                    projectStage=project.get("stage", "LIVE"), **config)
+            else:
+                response = self.client.update_data_automation_project(
+                    projectArn=project_change.arn, projectDescription=project.get("description", ""),
+                    projectStage=project.get("stage", "LIVE"), **config)
+            project_change.arn = response["projectArn"]
+        except Exception as e:
+            project_change.error = str(e)
+        project_change.seconds = time.time() - start
+        return changes
+
+
+def report(changes: List[Change], applied: bool) -> None:
+    logging.info("%s:", "Apply result" if applied else "Plan")
+    for change in changes:
+        status = f"ERROR {change.error}" if change.error else change.reason
+        timing = f" ({change.seconds:.1f}s)" if applied and change.action != "noop" else ""
+        logging.info("  %-9s %-8s %-24s %s%s", change.kind, change.action, change.name, status, timing)
+        if change.arn and applied:
+            logging.info("            %s", change.arn)
+    counts = {action: sum(c.action == action for c in changes) for action in ("create", "update", "noop")}
+    logging.info("  %d to create, %d to update, %d unchanged", counts["create"], counts["update"], counts["noop"])
+
 
 def main():
-    blueprint_arns = create_blueprints()
-    blueprint_arns += [
-       'arn:aws:bedrock:us-east-1:aws:blueprint/bedrock-data-automation-public-bank-statement',
-       'arn:aws:bedrock:us-east-1:aws:blueprint/bedrock-data-automation-public-payslip',
-       'arn:aws:bedrock:us-east-1:aws:blueprint/bedrock-data-automation-public-us-bank-check',
-       'arn:aws:bedrock:us-east-1:aws:blueprint/bedrock-data-automation-public-us-driver-license',
-       'arn:aws:bedrock:us-east-1:aws:blueprint/bedrock-data-automation-public-w2-form' 
-    ]
-    project_arn = create_project(blueprint_arns=blueprint_arns)
-    print(project_arn)
+    parser = argparse.ArgumentParser(description="Sync BDA blueprints and project with a manifest")
+    parser.add_argument("--manifest", type=Path, default=DEFAULT_MANIFEST)
+    parser.add_argument("--apply", action="store_true", help="apply the plan instead of only showing it")
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--output-profile", choices=list(OUTPUT_PROFILES), help="override the manifest output profile")
+    parser.add_argument("--report", type=Path, help="write the plan/apply report as JSON")
+    args = parser.parse_args()
+
+    start = time.time()
+    sync = BdaSync(load_manifest(args.manifest, args.output_profile), max_workers=args.max_workers)
+    changes = sync.plan()
+    if args.apply:
+        changes = sync.apply(changes)
+    report(changes, args.apply)
+    logging.info("Finished in %.1fs", time.time() - start)
+
+    if args.report:
+        args.report.write_text(json.dumps(
+            [{k: v for k, v in asdict(c).items() if k != "desired"} for c in changes], indent=2), encoding="utf-8")
+    if any(c.error for c in changes):
+        raise SystemExit(1)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,79 @@
+import copy
+
+
+def _document(granularity, text_formats, bounding_box=False, generative_field=False):
+    return {
+        'extraction': {
+            'granularity': {'types': list(granularity)},
+            'boundingBox': {'state': 'ENABLED' if bounding_box else 'DISABLED'}
+        },
+        'generativeField': {'state': 'ENABLED' if generative_field else 'DISABLED'},
+        'outputFormat': {
+            'textFormat': {'types': list(text_formats)},
+            'additionalFileFormat': {'state': 'DISABLED'}
+        }
+    }
+
+
+# Image, video and audio settings for projects that only process documents
+_MEDIA_DISABLED = {
+    'image': {
+        'extraction': {'category': {'state': 'DISABLED'}, 'boundingBox': {'state': 'DISABLED'}},
+        'generativeField': {'state': 'DISABLED'}
+    },
+    'video': {
+        'extraction': {'category': {'state': 'DISABLED'}, 'boundingBox': {'state': 'DISABLED'}},
+        'generativeField': {'state': 'DISABLED'}
+    },
+    'audio': {
+        'extraction': {'category': {'state': 'DISABLED'}},
+        'generativeField': {'state': 'DISABLED'}
+    }
+}
+
+# Named standardOutputConfiguration profiles:
+#   custom-only     only the blueprint (custom) output is read
+#   markdown-pages  custom output plus page markdown, which the agentcore lambda
+#                   sends for segments that match no blueprint
+#   full            every granularity, text format and generative field
+OUTPUT_PROFILES = {
+    'custom-only': {'document': _document(['DOCUMENT'], ['PLAIN_TEXT']), **_MEDIA_DISABLED},
+    'markdown-pages': {'document': _document(['PAGE'], ['MARKDOWN']), **_MEDIA_DISABLED},
+    'full': {
+        'document': _document(['PAGE', 'ELEMENT'], ['PLAIN_TEXT', 'MARKDOWN', 'HTML', 'CSV'],
+                              bounding_box=True, generative_field=True),
+        'image': {
+            'extraction': {
+                'category': {'state': 'ENABLED', 'types': ['TEXT_DETECTION']},
+                'boundingBox': {'state': 'ENABLED'}
+            },
+            'generativeField': {'state': 'ENABLED', 'types': ['IMAGE_SUMMARY']}
+        },
+        'video': {
+            'extraction': {
+                'category': {'state': 'ENABLED', 'types': ['TEXT_DETECTION']},
+                'boundingBox': {'state': 'ENABLED'}
+            },
+            'generativeField': {'state': 'ENABLED', 'types': ['VIDEO_SUMMARY', 'CHAPTER_SUMMARY']}
+        },
+        'audio': {
+            'extraction': {'category': {'state': 'ENABLED', 'types': ['TRANSCRIPT']}},
+            'generativeField': {'state': 'ENABLED', 'types': ['IAB']}
+        }
+    }
+}
+
+
+def standard_output_configuration(profile):
+    """
+    `standardOutputConfiguration` for a named profile.
+
+    Args:
+        profile (str): 'custom-only', 'markdown-pages' or 'full'
+
+    Returns:
+        dict: A copy that can be modified before creating the project
+    """
+    if profile not in OUTPUT_PROFILES:
+        raise ValueError(f"Unknown output profile '{profile}', expected one of {', '.join(OUTPUT_PROFILES)}")
+    return copy.deepcopy(OUTPUT_PROFILES[profile])